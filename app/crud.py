@@ -1,10 +1,10 @@
 from datetime import date, timedelta
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, aliased
 from .models import Subscription
 from .schemas import SubscriptionCreate
 from .models import CashflowEvent, Account, Plan
 from sqlalchemy import and_
-from sqlalchemy import func
+from sqlalchemy import func, case, delete, select
 
 def list_subscriptions(db: Session) -> list[Subscription]:
     return db.query(Subscription).order_by(Subscription.billing_day, Subscription.id).all()
@@ -32,7 +32,7 @@ def create_subscription(db: Session, data: SubscriptionCreate) -> Subscription:
 
 
 def delete_subscription(db: Session, sub_id: int) -> None:
-    sub = db.query(Subscription).filter(Subscription.id == sub_id).first()
+    sub = db.get(Subscription, sub_id)
     if sub:
         db.delete(sub)
         db.commit()
@@ -131,10 +131,19 @@ def total_start_balance(db, user_id: int = 1, as_of: date | None = None) -> int:
     return sum(int(a.balance_yen) for a in accounts if _account_is_active_on(a, as_of))
 
 def delete_plan(db, plan_id: int, user_id: int = 1) -> None:
-    p = db.query(Plan).filter(Plan.id == plan_id, Plan.user_id == user_id).first()
-    if p:
-        db.delete(p)
-        db.commit()
+    # ORM cascade だと紐づくイベントを全件ロードしてから消すため、DELETE 2本で済ませる
+    owned = select(Plan.id).where(Plan.id == plan_id, Plan.user_id == user_id)
+    db.execute(
+        delete(CashflowEvent)
+        .where(CashflowEvent.plan_id.in_(owned))
+        .execution_options(synchronize_session=False)
+    )
+    db.execute(
+        delete(Plan)
+        .where(Plan.id == plan_id, Plan.user_id == user_id)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
 
 def list_events_between_with_plan(db: Session, user_id: int, start, end):
     q = (
@@ -200,3 +209,112 @@ def list_withdraw_schedule(
             }
         )
     return out
+
+
+def payment_pie_between(db: Session, user_id: int, start: date, end: date, top_n: int = 8) -> list[dict]:
+    """
+    支出イベント（transfer除く）を表示タイトル単位でDB側で合算し、
+    金額の大きい順に top_n-1 件 + "Other" にまとめて返す。
+    """
+    label = func.coalesce(func.nullif(Plan.title, ""), func.nullif(CashflowEvent.description, ""), "-")
+    total = func.sum(-CashflowEvent.amount_yen)
+
+    rows = (
+        db.query(label.label("label"), total.label("total"))
+        .select_from(CashflowEvent)
+        .outerjoin(Plan, Plan.id == CashflowEvent.plan_id)
+        .filter(CashflowEvent.user_id == user_id)
+        .filter(CashflowEvent.date >= start, CashflowEvent.date <= end)
+        .filter(CashflowEvent.amount_yen < 0)
+        .filter(CashflowEvent.source != "transfer")
+        .group_by(label)
+        .order_by(total.desc(), label)
+        .all()
+    )
+
+    items = [(str(r.label), int(r.total or 0)) for r in rows]
+    if len(items) > top_n:
+        rest = sum(v for _, v in items[top_n - 1 :])
+        items = items[: top_n - 1] + [("Other", rest)]
+    return [{"label": k, "value": v} for k, v in items]
+
+
+def net_between(db: Session, user_id: int, start: date, end: date) -> int:
+    """期間内イベントの増減合計（円）"""
+    total = (
+        db.query(func.coalesce(func.sum(CashflowEvent.amount_yen), 0))
+        .filter(CashflowEvent.user_id == user_id)
+        .filter(CashflowEvent.date >= start, CashflowEvent.date <= end)
+        .scalar()
+    )
+    return int(total or 0)
+
+
+def account_net_by_month(
+    db: Session,
+    user_id: int,
+    this_first: date,
+    this_last: date,
+    next_first: date,
+    next_last: date,
+) -> tuple[dict[int, int], dict[int, int]]:
+    """
+    今月・来月のイベント増減を口座ごとに1クエリで集計する。
+    戻り値: (今月 {account_id: net}, 来月 {account_id: net})
+    """
+    bucket = case(
+        (CashflowEvent.date <= this_last, "this"),
+        (CashflowEvent.date >= next_first, "next"),
+    )
+
+    rows = (
+        db.query(CashflowEvent.account_id, bucket.label("bucket"), func.sum(CashflowEvent.amount_yen))
+        .filter(CashflowEvent.user_id == user_id)
+        .filter(CashflowEvent.date >= this_first, CashflowEvent.date <= next_last)
+        .group_by(CashflowEvent.account_id, bucket)
+        .all()
+    )
+
+    this_by_acc: dict[int, int] = {}
+    next_by_acc: dict[int, int] = {}
+    for account_id, b, total in rows:
+        target = this_by_acc if b == "this" else next_by_acc
+        target[int(account_id)] = int(total or 0)
+    return this_by_acc, next_by_acc
+
+
+def list_transfer_pairs(db: Session, user_id: int, limit: int = 30) -> list:
+    """
+    振替イベントを transfer_id で自己結合し、from(マイナス側)/to(プラス側)の1行にまとめて返す。
+    片側しかない不完全なペアは結合で自然に除外される。
+    """
+    ev_from = aliased(CashflowEvent)
+    ev_to = aliased(CashflowEvent)
+
+    return (
+        db.query(
+            ev_to.transfer_id.label("transfer_id"),
+            ev_to.id.label("id"),
+            ev_to.date.label("date"),
+            ev_to.amount_yen.label("amount_yen"),
+            ev_from.account_id.label("from_id"),
+            ev_to.account_id.label("to_id"),
+        )
+        .select_from(ev_from)
+        .join(
+            ev_to,
+            and_(
+                ev_to.transfer_id == ev_from.transfer_id,
+                ev_to.source == "transfer",
+                ev_to.user_id == user_id,
+                ev_to.amount_yen > 0,
+            ),
+        )
+        .filter(ev_from.user_id == user_id)
+        .filter(ev_from.source == "transfer")
+        .filter(ev_from.transfer_id.isnot(None))
+        .filter(ev_from.amount_yen < 0)
+        .order_by(ev_to.date.desc(), ev_to.id.desc())
+        .limit(limit)
+        .all()
+    )
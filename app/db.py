@@ -1,16 +1,44 @@
 import os
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, DeclarativeBase
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session, sessionmaker, DeclarativeBase
 
 load_dotenv()
 
 DB_URL = os.getenv("DB_URL", "sqlite:///./app.db")
 
-engine = create_engine(
-    DB_URL,
-    connect_args={"check_same_thread": False} if DB_URL.startswith("sqlite") else {}
-)
+
+def _engine_options(url: str) -> dict:
+    if url.startswith("sqlite"):
+        return {"connect_args": {"check_same_thread": False}}
+    # server databases: keep enough pooled connections for the sync endpoint threadpool
+    options: dict = {"pool_size": 10, "max_overflow": 20}
+    if make_url(url).get_driver_name() == "psycopg2":
+        # psycopg2 runs executemany row by row unless batching is opted into
+        options.update(
+            {
+                "executemany_mode": "values_plus_batch",
+                "insertmanyvalues_page_size": 1000,
+                "executemany_batch_page_size": 500,
+            }
+        )
+    return options
+
+
+engine = create_engine(DB_URL, **_engine_options(DB_URL))
+
+
+if DB_URL.startswith("sqlite"):
+
+    @event.listens_for(engine, "connect")
+    def _sqlite_pragmas(dbapi_conn, _record) -> None:
+        # WAL + NORMAL: commits append to the WAL without fsync; a power loss can drop the last commits but never corrupts the file
+        cur = dbapi_conn.cursor()
+        cur.execute("PRAGMA journal_mode=WAL")
+        cur.execute("PRAGMA synchronous=NORMAL")
+        cur.execute("PRAGMA temp_store=MEMORY")
+        cur.close()
 
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 
@@ -23,3 +51,37 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# ---- data version stamp (models.DataVersion) ----
+# Every Session that commits a write also bumps data_version in the same transaction, so
+# per-process read caches keyed on it go stale in every worker, script and host at once.
+@event.listens_for(Session, "do_orm_execute")
+def _mark_bulk_write(state) -> None:
+    if state.is_insert or state.is_update or state.is_delete:
+        state.session.info["data_changed"] = True
+
+
+@event.listens_for(Session, "after_flush")
+def _mark_flushed_write(session, _flush_context) -> None:
+    session.info["data_changed"] = True
+
+
+@event.listens_for(Session, "before_commit")
+def _bump_data_version(session) -> None:
+    changed = session.info.pop("data_changed", False)
+    if not (changed or session.new or session.dirty or session.deleted):
+        return
+    # on the session's connection directly, so the bump itself does not re-enter the hooks above
+    conn = session.connection()
+    if conn.execute(text("UPDATE data_version SET version = version + 1 WHERE id = 1")).rowcount == 0:
+        conn.execute(text("INSERT INTO data_version (id, version) VALUES (1, 1)"))
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back_write(session) -> None:
+    session.info.pop("data_changed", None)
+
+
+def read_data_version(db: Session) -> int:
+    return int(db.execute(text("SELECT version FROM data_version WHERE id = 1")).scalar() or 0)
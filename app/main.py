@@ -1,19 +1,24 @@
 ﻿from dotenv import load_dotenv
 load_dotenv()
 
+from typing import Annotated, BinaryIO
+from collections.abc import Iterator
+from contextlib import asynccontextmanager, contextmanager
 from uuid import uuid4
 from fastapi import FastAPI, Depends, Request, Form, HTTPException, Query, UploadFile, File
-from sqlalchemy import text
-from fastapi.responses import HTMLResponse, RedirectResponse, FileResponse, Response
+from sqlalchemy import text, insert, select, update, delete, tuple_, exists
+from fastapi.responses import HTMLResponse, RedirectResponse, FileResponse, Response, ORJSONResponse
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
-from sqlalchemy.orm import Session, joinedload
-from pydantic import BaseModel, Field
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+from pydantic import BaseModel, Field, field_validator
 from datetime import date, datetime, timedelta
-import calendar
+import os
 import re
 import csv
-import io
+import hashlib
+import orjson
 
 from app.services.scheduler import (
     rebuild_events as rebuild_events_scheduler,
@@ -23,13 +28,14 @@ from app.services.scheduler import (
     occurs_monthly_interval,
     _subscription_occurrences_in_range,
 )
-from .db import Base, engine, get_db, SessionLocal
+from .db import Base, engine, get_db, read_data_version
 from .schemas import SubscriptionCreate, SubscriptionOut
 from . import crud
 from .models import (
     Account,
     Card,
     CardTransaction,
+    CardStatement,
     CashflowEvent,
     Subscription,
     VariableRecurringPayment,
@@ -37,17 +43,26 @@ from .models import (
     Plan,
     CardRevolving,
     CardInstallment,
+    ImportBatch,
 )
 from .crud import list_accounts, create_account
 from app.services.forecast import forecast_by_account_events, forecast_by_account_daily
 from .services.forecast import forecast_free_daily
 from app.advice.service import get_today_advice
-from app.utils.dates import month_range, resolve_day_in_month, apply_business_day_rule
+from app.utils.dates import (
+    month_range,
+    next_month_first,
+    last_day_of_month,
+    parse_ymd,
+    resolve_day_in_month,
+    apply_business_day_rule,
+)
 from app.services.statement_import import (
     parse_card_text_preview,
     parse_card_csv_preview,
+    open_csv_dict_reader,
+    peek_csv_header,
     detect_duplicates,
-    build_import_key,
     parse_flexible_date,
     normalize_title,
 )
@@ -58,91 +73,176 @@ from app.services.monthly_report import (
 )
 
 DEFAULT_EFFECTIVE_START_DATE = date(1998, 1, 31)
-
-# create tables at startup (local/dev only)
-Base.metadata.create_all(bind=engine)
+BULK_ID_SEPARATOR_RE = re.compile(r"[,\s]+")
+# card charge rows keep the target account in charge_to_account_id; the note is display text only
+CHARGE_NOTE_PREFIX = "charge to account_id="
+IN_CLAUSE_CHUNK_SIZE = 500
+# CSV imports flush rows in batches of this size; everything is still committed once at the end
+CSV_INSERT_BATCH_SIZE = 1000
 
 # ---- lightweight migration for new Plan columns (local sqlite only) ----
-def _ensure_plan_columns() -> None:
+def _ensure_plan_columns(conn: Connection) -> None:
     if not str(engine.url).startswith("sqlite"):
         return
-    with engine.connect() as conn:
-        cols = [r[1] for r in conn.execute(text("PRAGMA table_info(plans)")).fetchall()]
-        if "payment_method" not in cols:
-            conn.execute(text("ALTER TABLE plans ADD COLUMN payment_method VARCHAR(20) NOT NULL DEFAULT 'bank'"))
-        if "card_id" not in cols:
-            conn.execute(text("ALTER TABLE plans ADD COLUMN card_id INTEGER"))
-        if "end_date" not in cols:
-            conn.execute(text("ALTER TABLE plans ADD COLUMN end_date DATE"))
-
-_ensure_plan_columns()
+    cols = [r[1] for r in conn.execute(text("PRAGMA table_info(plans)")).fetchall()]
+    if "payment_method" not in cols:
+        conn.execute(text("ALTER TABLE plans ADD COLUMN payment_method VARCHAR(20) NOT NULL DEFAULT 'bank'"))
+    if "card_id" not in cols:
+        conn.execute(text("ALTER TABLE plans ADD COLUMN card_id INTEGER"))
+    if "end_date" not in cols:
+        conn.execute(text("ALTER TABLE plans ADD COLUMN end_date DATE"))
 
 
 # ---- lightweight migration for new Subscription columns (local sqlite only) ----
-def _ensure_subscription_columns() -> None:
+def _ensure_subscription_columns(conn: Connection) -> None:
     if not str(engine.url).startswith("sqlite"):
         return
-    with engine.connect() as conn:
-        cols = [r[1] for r in conn.execute(text("PRAGMA table_info(subscriptions)")).fetchall()]
-        if "freq" not in cols:
-            conn.execute(text("ALTER TABLE subscriptions ADD COLUMN freq VARCHAR(30) NOT NULL DEFAULT 'monthly'"))
-        if "interval_months" not in cols:
-            conn.execute(text("ALTER TABLE subscriptions ADD COLUMN interval_months INTEGER NOT NULL DEFAULT 1"))
-        if "interval_weeks" not in cols:
-            conn.execute(text("ALTER TABLE subscriptions ADD COLUMN interval_weeks INTEGER NOT NULL DEFAULT 1"))
-        if "billing_month" not in cols:
-            conn.execute(text("ALTER TABLE subscriptions ADD COLUMN billing_month INTEGER NOT NULL DEFAULT 1"))
-        if "payment_method" not in cols:
-            conn.execute(text("ALTER TABLE subscriptions ADD COLUMN payment_method VARCHAR(20) NOT NULL DEFAULT 'bank'"))
-        if "account_id" not in cols:
-            conn.execute(text("ALTER TABLE subscriptions ADD COLUMN account_id INTEGER"))
-        if "card_id" not in cols:
-            conn.execute(text("ALTER TABLE subscriptions ADD COLUMN card_id INTEGER"))
-        if "effective_start_date" not in cols:
-            conn.execute(text("ALTER TABLE subscriptions ADD COLUMN effective_start_date DATE"))
-        if "effective_end_date" not in cols:
-            conn.execute(text("ALTER TABLE subscriptions ADD COLUMN effective_end_date DATE"))
-        conn.execute(
-            text("UPDATE subscriptions SET effective_start_date = :d WHERE effective_start_date IS NULL"),
-            {"d": DEFAULT_EFFECTIVE_START_DATE.isoformat()},
-        )
-        conn.commit()
+    cols = [r[1] for r in conn.execute(text("PRAGMA table_info(subscriptions)")).fetchall()]
+    if "freq" not in cols:
+        conn.execute(text("ALTER TABLE subscriptions ADD COLUMN freq VARCHAR(30) NOT NULL DEFAULT 'monthly'"))
+    if "interval_months" not in cols:
+        conn.execute(text("ALTER TABLE subscriptions ADD COLUMN interval_months INTEGER NOT NULL DEFAULT 1"))
+    if "interval_weeks" not in cols:
+        conn.execute(text("ALTER TABLE subscriptions ADD COLUMN interval_weeks INTEGER NOT NULL DEFAULT 1"))
+    if "billing_month" not in cols:
+        conn.execute(text("ALTER TABLE subscriptions ADD COLUMN billing_month INTEGER NOT NULL DEFAULT 1"))
+    if "payment_method" not in cols:
+        conn.execute(text("ALTER TABLE subscriptions ADD COLUMN payment_method VARCHAR(20) NOT NULL DEFAULT 'bank'"))
+    if "account_id" not in cols:
+        conn.execute(text("ALTER TABLE subscriptions ADD COLUMN account_id INTEGER"))
+    if "card_id" not in cols:
+        conn.execute(text("ALTER TABLE subscriptions ADD COLUMN card_id INTEGER"))
+    if "effective_start_date" not in cols:
+        conn.execute(text("ALTER TABLE subscriptions ADD COLUMN effective_start_date DATE"))
+    if "effective_end_date" not in cols:
+        conn.execute(text("ALTER TABLE subscriptions ADD COLUMN effective_end_date DATE"))
+    conn.execute(
+        text("UPDATE subscriptions SET effective_start_date = :d WHERE effective_start_date IS NULL"),
+        {"d": DEFAULT_EFFECTIVE_START_DATE.isoformat()},
+    )
 
-_ensure_subscription_columns()
 
+def _ensure_account_card_columns(conn: Connection) -> None:
+    if not str(engine.url).startswith("sqlite"):
+        return
+    acc_cols = [r[1] for r in conn.execute(text("PRAGMA table_info(accounts)")).fetchall()]
+    if "effective_start_date" not in acc_cols:
+        conn.execute(text("ALTER TABLE accounts ADD COLUMN effective_start_date DATE"))
+    if "effective_end_date" not in acc_cols:
+        conn.execute(text("ALTER TABLE accounts ADD COLUMN effective_end_date DATE"))
+    conn.execute(
+        text("UPDATE accounts SET effective_start_date = :d WHERE effective_start_date IS NULL"),
+        {"d": DEFAULT_EFFECTIVE_START_DATE.isoformat()},
+    )
 
-def _ensure_account_card_columns() -> None:
+    card_cols = [r[1] for r in conn.execute(text("PRAGMA table_info(cards)")).fetchall()]
+    if "effective_start_date" not in card_cols:
+        conn.execute(text("ALTER TABLE cards ADD COLUMN effective_start_date DATE"))
+    if "effective_end_date" not in card_cols:
+        conn.execute(text("ALTER TABLE cards ADD COLUMN effective_end_date DATE"))
+    conn.execute(
+        text("UPDATE cards SET effective_start_date = :d WHERE effective_start_date IS NULL"),
+        {"d": DEFAULT_EFFECTIVE_START_DATE.isoformat()},
+    )
+
+
+def _ensure_card_transaction_columns(conn: Connection) -> None:
     if not str(engine.url).startswith("sqlite"):
         return
-    with engine.connect() as conn:
-        acc_cols = [r[1] for r in conn.execute(text("PRAGMA table_info(accounts)")).fetchall()]
-        if "effective_start_date" not in acc_cols:
-            conn.execute(text("ALTER TABLE accounts ADD COLUMN effective_start_date DATE"))
-        if "effective_end_date" not in acc_cols:
-            conn.execute(text("ALTER TABLE accounts ADD COLUMN effective_end_date DATE"))
-        conn.execute(
-            text("UPDATE accounts SET effective_start_date = :d WHERE effective_start_date IS NULL"),
-            {"d": DEFAULT_EFFECTIVE_START_DATE.isoformat()},
-        )
+    cols = [r[1] for r in conn.execute(text("PRAGMA table_info(card_transactions)")).fetchall()]
+    if "charge_to_account_id" not in cols:
+        conn.execute(text("ALTER TABLE card_transactions ADD COLUMN charge_to_account_id INTEGER"))
+    # backfill charge rows written before the column existed (note = "charge to account_id=123")
+    conn.execute(
+        text(
+            "UPDATE card_transactions"
+            " SET charge_to_account_id = CAST(SUBSTR(note, :start) AS INTEGER)"
+            " WHERE charge_to_account_id IS NULL AND note LIKE :prefix"
+        ),
+        {"start": len(CHARGE_NOTE_PREFIX) + 1, "prefix": f"{CHARGE_NOTE_PREFIX}%"},
+    )
 
-        card_cols = [r[1] for r in conn.execute(text("PRAGMA table_info(cards)")).fetchall()]
-        if "effective_start_date" not in card_cols:
-            conn.execute(text("ALTER TABLE cards ADD COLUMN effective_start_date DATE"))
-        if "effective_end_date" not in card_cols:
-            conn.execute(text("ALTER TABLE cards ADD COLUMN effective_end_date DATE"))
-        conn.execute(
-            text("UPDATE cards SET effective_start_date = :d WHERE effective_start_date IS NULL"),
-            {"d": DEFAULT_EFFECTIVE_START_DATE.isoformat()},
-        )
-        conn.commit()
+
+# create_all() skips indexes of tables that already exist, so add missing ones here.
+def _ensure_indexes(conn: Connection) -> None:
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=conn, checkfirst=True)
 
 
-_ensure_account_card_columns()
+# Bump when the column migrations (_ensure_* above) change so existing local DBs re-run them once.
+# New tables and indexes do not need a bump: create_all/_ensure_indexes run on every start.
+SCHEMA_USER_VERSION = 4
+# pg_advisory_xact_lock key shared by every worker running init_schema
+SCHEMA_LOCK_KEY = 74_001
 
-app = FastAPI(title="pay_app")
+
+@contextmanager
+def _schema_lock() -> Iterator[Connection]:
+    # One connection holds the database write lock from the version check to the version bump,
+    # so workers starting together run the DDL one after another instead of racing on it.
+    if str(engine.url).startswith("sqlite"):
+        # AUTOCOMMIT keeps pysqlite from opening/committing transactions itself; SQLite DDL is
+        # transactional, so everything below commits (or rolls back) as one unit.
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.exec_driver_sql("ROLLBACK")
+                raise
+            conn.exec_driver_sql("COMMIT")
+        return
+    with engine.begin() as conn:
+        if engine.dialect.name == "postgresql":
+            conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": SCHEMA_LOCK_KEY})
+        yield conn
+
+
+def init_schema() -> None:
+    """
+    create_all + lightweight migrations (local/dev only), run under one schema lock.
+    SQLite keeps the applied version in PRAGMA user_version, re-read after the lock is taken,
+    so later worker starts skip the column migrations.
+    """
+    is_sqlite = str(engine.url).startswith("sqlite")
+    with _schema_lock() as conn:
+        # checkfirst, so cheap enough to run on every start
+        Base.metadata.create_all(bind=conn)
+
+        applied = int(conn.execute(text("PRAGMA user_version")).scalar() or 0) if is_sqlite else 0
+        if applied < SCHEMA_USER_VERSION:
+            _ensure_plan_columns(conn)
+            _ensure_subscription_columns(conn)
+            _ensure_account_card_columns(conn)
+            _ensure_card_transaction_columns(conn)
+        # after the column migrations: some indexes cover columns they add
+        _ensure_indexes(conn)
+
+        if is_sqlite and applied < SCHEMA_USER_VERSION:
+            conn.execute(text(f"PRAGMA user_version = {SCHEMA_USER_VERSION}"))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    init_schema()
+    yield
+
+
+app = FastAPI(title="pay_app", lifespan=lifespan)
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
 
 templates = Jinja2Templates(directory="app/templates")
+# compiled templates stay in the Environment cache; skip the per-render mtime check unless editing templates
+templates.env.auto_reload = os.getenv("TEMPLATES_AUTO_RELOAD", "0") == "1"
+
+
+# Per-process read caches. Both keys include the DB data_version, which every committed write
+# bumps in its own transaction, so a write from any worker, script or host makes the entries unreachable.
+# Serialized /api/forecast/free body + ETag, keyed by "user_id:today:data_version".
+_FORECAST_FREE_CACHE: dict[str, tuple[bytes, str]] = {}
+# Rendered "/" page, keyed by "user_id:today:data_version:base_url".
+_INDEX_PAGE_CACHE: dict[str, bytes] = {}
 
 
 @app.get("/favicon.ico", include_in_schema=False)
@@ -150,32 +250,33 @@ def favicon():
     return FileResponse("app/static/favicon.png", media_type="image/png")
 
 
-def _decode_csv_bytes(content: bytes) -> str:
-    last_err = None
-    for enc in ("utf-8-sig", "cp932", "utf-8"):
-        try:
-            return content.decode(enc)
-        except Exception as e:
-            last_err = e
-    raise HTTPException(status_code=400, detail=f"CSV decode failed: {last_err}")
-
+@contextmanager
+def _csv_dict_reader(stream: BinaryIO, required: set[str], missing_detail: str) -> Iterator[csv.DictReader]:
+    # reject bad headers from the first line, before the whole upload is scanned for its encoding
+    header = peek_csv_header(stream)
+    if header is not None:
+        if not header:
+            raise HTTPException(status_code=400, detail="CSV header is required")
+        if not required.issubset({h.strip().lower() for h in header}):
+            raise HTTPException(status_code=400, detail=missing_detail)
 
-def _csv_dict_rows(content: bytes) -> list[dict[str, str]]:
-    text = _decode_csv_bytes(content)
-    reader = csv.DictReader(io.StringIO(text))
-    if not reader.fieldnames:
-        raise HTTPException(status_code=400, detail="CSV header is required")
-    return [dict(r) for r in reader]
+    # rows are decoded one at a time from the upload's spooled file
+    try:
+        with open_csv_dict_reader(stream) as reader:
+            if not reader.fieldnames:
+                raise HTTPException(status_code=400, detail="CSV header is required")
+            if not required.issubset({h.strip().lower() for h in reader.fieldnames}):
+                raise HTTPException(status_code=400, detail=missing_detail)
+            yield reader
+    except UnicodeDecodeError as e:
+        raise HTTPException(status_code=400, detail=f"CSV decode failed: {e}")
 
 
 def _parse_csv_date(v: str) -> date:
-    s = (v or "").strip()
-    for fmt in ("%Y/%m/%d", "%Y-%m-%d", "%Y.%m.%d"):
-        try:
-            return datetime.strptime(s, fmt).date()
-        except ValueError:
-            pass
-    raise ValueError(f"invalid date: {v}")
+    d = parse_ymd((v or "").strip())
+    if d is None:
+        raise ValueError(f"invalid date: {v}")
+    return d
 
 
 def _parse_csv_amount(v: str) -> int:
@@ -204,7 +305,7 @@ def _parse_optional_date(v: str | None, field_name: str) -> date | None:
     if not s:
         return None
     try:
-        return datetime.strptime(s, "%Y-%m-%d").date()
+        return date.fromisoformat(s)
     except ValueError:
         raise HTTPException(status_code=400, detail=f"{field_name} must be YYYY-MM-DD")
 
@@ -223,7 +324,7 @@ def _ensure_effective_range(start_d: date | None, end_d: date | None, target: st
 
 def _parse_bulk_ids(ids: str) -> list[int]:
     parsed_ids: list[int] = []
-    for part in re.split(r"[,\s]+", (ids or "").strip()):
+    for part in BULK_ID_SEPARATOR_RE.split((ids or "").strip()):
         if not part:
             continue
         if not part.isdigit():
@@ -234,30 +335,62 @@ def _parse_bulk_ids(ids: str) -> list[int]:
     return sorted(set(parsed_ids))
 
 
-def _resolve_account_id(db: Session, key: str) -> int:
+def _chunked(values: list, size: int) -> list[list]:
+    return [values[i : i + size] for i in range(0, len(values), size)]
+
+
+def _card_exists(db: Session, card_id: int) -> bool:
+    return bool(db.scalar(select(exists().where(Card.id == card_id))))
+
+
+def _account_exists(db: Session, account_id: int) -> bool:
+    return bool(db.scalar(select(exists().where(Account.id == account_id))))
+
+
+def _load_name_index(db: Session, model) -> tuple[dict[str, int], set[int]]:
+    # one query per import instead of one per CSV row; first id wins on duplicate names
+    by_name: dict[str, int] = {}
+    ids: set[int] = set()
+    for obj_id, name in db.query(model.id, model.name).order_by(model.id).all():
+        ids.add(int(obj_id))
+        by_name.setdefault(name, int(obj_id))
+    return by_name, ids
+
+
+def _load_account_index(db: Session) -> tuple[dict[str, int], set[int]]:
+    return _load_name_index(db, Account)
+
+
+def _load_card_index(db: Session) -> tuple[dict[str, int], set[int]]:
+    return _load_name_index(db, Card)
+
+
+def _resolve_account_id(index: tuple[dict[str, int], set[int]], key: str) -> int:
     s = (key or "").strip()
     if not s:
         raise ValueError("account is empty")
+    by_name, ids = index
     if s.isdigit():
-        acc = db.query(Account).filter(Account.id == int(s)).first()
+        acc_id = int(s) if int(s) in ids else None
     else:
-        acc = db.query(Account).filter(Account.name == s).first()
-    if acc is None:
+        acc_id = by_name.get(s)
+    if acc_id is None:
         raise ValueError(f"account not found: {s}")
-    return int(acc.id)
+    return acc_id
 
 
-def _resolve_card_id(db: Session, key: str) -> int:
+def _resolve_card_id(index: tuple[dict[str, int], set[int]], key: str) -> int:
     s = (key or "").strip()
     if not s:
         raise ValueError("card is empty")
+    by_name, ids = index
     if s.isdigit():
-        card = db.query(Card).filter(Card.id == int(s)).first()
+        card_id = int(s) if int(s) in ids else None
     else:
-        card = db.query(Card).filter(Card.name == s).first()
-    if card is None:
+        card_id = by_name.get(s)
+    if card_id is None:
         raise ValueError(f"card not found: {s}")
-    return int(card.id)
+    return card_id
 
 
 def _parse_direction(v: str) -> str:
@@ -270,6 +403,46 @@ def _parse_direction(v: str) -> str:
     raise ValueError(f"invalid type: {v}")
 
 
+class TransferForm(BaseModel):
+    date_: date = Field(alias="date")
+    from_account_id: int
+    to_account_id: int
+    amount_yen: int
+    method: str  # "bank" / "debit" / "card"
+    description: str = "郢昶・ﾎ慕ｹ晢ｽｼ郢ｧ・ｸ"
+    card_id: int | None = None
+
+    @field_validator("card_id", mode="before")
+    @classmethod
+    def _blank_card_id(cls, v):
+        # the transfer form's card select submits "" for its "-" option
+        if isinstance(v, str) and not v.strip():
+            return None
+        return v
+
+
+class TransferUpdateForm(BaseModel):
+    date_: date = Field(alias="date")
+    from_account_id: int
+    to_account_id: int
+    amount_yen: int
+
+
+class OneoffUpdateForm(BaseModel):
+    date_: date = Field(alias="date")
+    account_id: int
+    amount_yen: int
+    direction: str
+    description: str
+
+
+class CardChargeUpdateForm(BaseModel):
+    date_: date = Field(alias="date")
+    amount_yen: int
+    card_id: int
+    to_account_id: int
+
+
 class ImportRowIn(BaseModel):
     date: str
     title: str
@@ -287,36 +460,43 @@ class ImportCommitIn(BaseModel):
     allow_duplicates: bool = False
 
 
-def _existing_card_keys(db: Session, card_id: int, date_strings: list[str]) -> set[tuple[str, str, int, int]]:
-    dates: set[date] = set()
-    for s in date_strings:
+def _parse_row_date_amounts(rows: list[dict]) -> set[tuple[date, int]]:
+    out: set[tuple[date, int]] = set()
+    for r in rows:
         try:
-            dates.add(parse_flexible_date(s))
+            out.add((parse_flexible_date(str(r.get("date", ""))), int(r.get("price", 0))))
         except Exception:
             continue
-    if not dates:
+    return out
+
+
+def _existing_card_keys(
+    db: Session, card_id: int, candidates: set[tuple[date, int]]
+) -> set[tuple[str, str, int, int]]:
+    # only rows matching a candidate (date, amount) come back; merchant is compared after normalize_title
+    if not candidates:
         return set()
 
-    existing = (
-        db.query(CardTransaction)
-        .filter(CardTransaction.card_id == card_id)
-        .filter(CardTransaction.date.in_(list(dates)))
-        .all()
-    )
     out: set[tuple[str, str, int, int]] = set()
-    for t in existing:
-        out.add((t.date.isoformat(), normalize_title(t.merchant or ""), int(t.amount_yen), int(card_id)))
+    # two bind params per pair
+    for chunk in _chunked(sorted(candidates), IN_CLAUSE_CHUNK_SIZE // 2):
+        rows = db.execute(
+            select(CardTransaction.date, CardTransaction.merchant, CardTransaction.amount_yen)
+            .where(CardTransaction.card_id == card_id)
+            .where(tuple_(CardTransaction.date, CardTransaction.amount_yen).in_(chunk))
+        ).all()
+        for d, merchant, amount_yen in rows:
+            out.add((d.isoformat(), normalize_title(merchant or ""), int(amount_yen), int(card_id)))
     return out
 
 
-@app.post("/import/preview_text")
+@app.post("/import/preview_text", response_class=ORJSONResponse)
 def import_preview_text(payload: ImportPreviewTextIn, db: Session = Depends(get_db)):
-    card = db.query(Card).filter(Card.id == int(payload.card)).first()
-    if card is None:
+    if not _card_exists(db, int(payload.card)):
         raise HTTPException(status_code=400, detail="card not found")
 
     rows, warnings, errors = parse_card_text_preview(payload.text)
-    existing_keys = _existing_card_keys(db, int(payload.card), [str(r.get("date", "")) for r in rows])
+    existing_keys = _existing_card_keys(db, int(payload.card), _parse_row_date_amounts(rows))
     duplicate_candidates = detect_duplicates(rows, int(payload.card), existing_keys)
     if duplicate_candidates:
         warnings = list(warnings) + [f"重複候補: {len(duplicate_candidates)}件"]
@@ -333,19 +513,17 @@ def import_preview_text(payload: ImportPreviewTextIn, db: Session = Depends(get_
     }
 
 
-@app.post("/import/preview_csv")
-async def import_preview_csv(
+@app.post("/import/preview_csv", response_class=ORJSONResponse)
+def import_preview_csv(
     card: int = Form(...),
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
 ):
-    card_obj = db.query(Card).filter(Card.id == int(card)).first()
-    if card_obj is None:
+    if not _card_exists(db, int(card)):
         raise HTTPException(status_code=400, detail="card not found")
 
-    content = await file.read()
-    rows, warnings, errors = parse_card_csv_preview(content)
-    existing_keys = _existing_card_keys(db, int(card), [str(r.get("date", "")) for r in rows])
+    rows, warnings, errors = parse_card_csv_preview(file.file)
+    existing_keys = _existing_card_keys(db, int(card), _parse_row_date_amounts(rows))
     duplicate_candidates = detect_duplicates(rows, int(card), existing_keys)
     if duplicate_candidates:
         warnings = list(warnings) + [f"重複候補: {len(duplicate_candidates)}件"]
@@ -364,8 +542,7 @@ async def import_preview_csv(
 
 @app.post("/import/commit")
 def import_commit(payload: ImportCommitIn, db: Session = Depends(get_db)):
-    card = db.query(Card).filter(Card.id == int(payload.card)).first()
-    if card is None:
+    if not _card_exists(db, int(payload.card)):
         raise HTTPException(status_code=400, detail="card not found")
 
     normalized_rows: list[dict] = []
@@ -376,16 +553,19 @@ def import_commit(payload: ImportCommitIn, db: Session = Depends(get_db)):
             p = int(r.price)
         except Exception as e:
             raise HTTPException(status_code=400, detail=f"row {i + 1} parse error: {e}")
-        normalized_rows.append({"date": d.strftime("%Y/%m/%d"), "title": t, "price": p})
+        normalized_rows.append({"parsed_date": d, "title": t, "price": p})
 
-    existing_keys = _existing_card_keys(db, int(payload.card), [x["date"] for x in normalized_rows])
+    existing_keys = _existing_card_keys(
+        db, int(payload.card), {(x["parsed_date"], int(x["price"])) for x in normalized_rows}
+    )
 
-    inserted = 0
+    rows_to_insert: list[dict] = []
     skipped: list[dict] = []
     seen_payload: set[tuple[str, str, int, int]] = set()
 
     for i, row in enumerate(normalized_rows):
-        key = build_import_key(row["date"], row["title"], int(row["price"]), int(payload.card))
+        # same shape as build_import_key, without re-parsing the date string
+        key = (row["parsed_date"].isoformat(), row["title"], int(row["price"]), int(payload.card))
         reason = None
         if key in existing_keys:
             reason = "existing"
@@ -404,18 +584,19 @@ def import_commit(payload: ImportCommitIn, db: Session = Depends(get_db)):
             )
             continue
 
-        db.add(
-            CardTransaction(
-                card_id=int(payload.card),
-                date=parse_flexible_date(row["date"]),
-                amount_yen=int(row["price"]),
-                merchant=row["title"],
-            )
+        rows_to_insert.append(
+            {
+                "card_id": int(payload.card),
+                "date": row["parsed_date"],
+                "amount_yen": int(row["price"]),
+                "merchant": row["title"],
+            }
         )
-        inserted += 1
         seen_payload.add(key)
 
+    inserted = len(rows_to_insert)
     if inserted > 0:
+        db.execute(insert(CardTransaction), rows_to_insert)
         db.commit()
 
     return {
@@ -427,6 +608,14 @@ def import_commit(payload: ImportCommitIn, db: Session = Depends(get_db)):
 
 @app.get("/", response_class=HTMLResponse)
 def page_index(request: Request, db: Session = Depends(get_db)):
+    today = date.today()
+    # nothing below changes until a write is committed or the date rolls over. The stamp is read
+    # before any data, so the page stored under it is never older than the stamp itself.
+    cache_key = f"1:{today.isoformat()}:{read_data_version(db)}:{request.base_url}"
+    cached = _INDEX_PAGE_CACHE.get(cache_key)
+    if cached is not None:
+        return HTMLResponse(content=cached)
+
     subs = crud.list_subscriptions(db)
     accounts = crud.list_accounts(db)
     plans = crud.list_plans(db)
@@ -436,52 +625,15 @@ def page_index(request: Request, db: Session = Depends(get_db)):
         .all()
     )
 
-    today = date.today()
     this_first, this_last = month_range(today)
-
-    # 隴夲ｽ･隴帙・
-    if this_first.month == 12:
-        next_first = date(this_first.year + 1, 1, 1)
-    else:
-        next_first = date(this_first.year, this_first.month + 1, 1)
-    next_first, next_last = month_range(next_first)
-
-    # 陷閧ｴ謫りｭ帙・
-    if next_first.month == 12:
-        next2_first = date(next_first.year + 1, 1, 1)
-    else:
-        next2_first = date(next_first.year, next_first.month + 1, 1)
-    next2_first, next2_last = month_range(next2_first)
+    next_first, next_last = month_range(next_month_first(this_first))
+    next2_first, next2_last = month_range(next_month_first(next_first))
 
     events_this = crud.list_events_between_with_plan(db, 1, this_first, this_last)
     events_next = crud.list_events_between_with_plan(db, 1, next_first, next_last)
-    events_next2 = crud.list_events_between_with_plan(db, 1, next2_first, next2_last)
 
-    def _build_payment_pie(events):
-        totals = {}
-        for e in events:
-            try:
-                amt = int(e.get("amount_yen") or 0)
-            except Exception:
-                amt = 0
-            if amt >= 0:
-                continue
-            if e.get("source") == "transfer":
-                continue
-            name = e.get("plan_title") or "-"
-            totals[name] = totals.get(name, 0) + abs(amt)
-
-        items = sorted(totals.items(), key=lambda x: x[1], reverse=True)
-        max_items = 8
-        if len(items) > max_items:
-            top = items[: max_items - 1]
-            rest = sum(v for _, v in items[max_items - 1 :])
-            items = top + [("Other", rest)]
-
-        return [{"label": k, "value": v} for k, v in items]
-
-    pay_pie_this = _build_payment_pie(events_this)
-    pay_pie_next = _build_payment_pie(events_next)
+    pay_pie_this = crud.payment_pie_between(db, 1, this_first, this_last)
+    pay_pie_next = crud.payment_pie_between(db, 1, next_first, next_last)
     from collections import defaultdict
 
     def _month_shift(d: date, add: int) -> date:
@@ -503,7 +655,7 @@ def page_index(request: Request, db: Session = Depends(get_db)):
 
     def _plan_occurs_in_month(plan: Plan, month_first: date) -> int:
         y, m = month_first.year, month_first.month
-        month_last = date(y, m, calendar.monthrange(y, m)[1])
+        month_last = date(y, m, last_day_of_month(y, m))
         start_d = plan.start_date or today
         if start_d > month_last:
             return 0
@@ -560,7 +712,7 @@ def page_index(request: Request, db: Session = Depends(get_db)):
         sub_monthly_totals: list[dict] = []
         sub_pie_totals: dict[str, int] = {}
         for month_first in months:
-            month_last = date(month_first.year, month_first.month, calendar.monthrange(month_first.year, month_first.month)[1])
+            month_last = month_range(month_first)[1]
             month_total = 0
             for s in subs:
                 amount = abs(int(getattr(s, "amount_yen", 0) or 0))
@@ -668,36 +820,25 @@ def page_index(request: Request, db: Session = Depends(get_db)):
             return False
         return True
 
-    start_balance = crud.total_start_balance(db, 1, as_of=this_first)
-    this_net = sum(e["amount_yen"] for e in events_this)
-    next_net = sum(e["amount_yen"] for e in events_next)
-    next2_net = sum(e["amount_yen"] for e in events_next2)
-
-    free_this = start_balance + this_net
-    free_next = start_balance + this_net + next_net
-    free_next2 = start_balance + this_net + next_net + next2_net
-
     # --- account summary (M1-6) ---
-    # events_* are dict rows with e["account_id"] and e["amount_yen"].
-    this_by_acc = defaultdict(int)
-    next_by_acc = defaultdict(int)
-
-    for e in events_this:
-        this_by_acc[int(e["account_id"])] += int(e["amount_yen"])
-
-    for e in events_next:
-        next_by_acc[int(e["account_id"])] += int(e["amount_yen"])
+    this_by_acc, next_by_acc = crud.account_net_by_month(db, 1, this_first, this_last, next_first, next_last)
 
+    # start balance is summed from the already loaded accounts (same rule as crud.total_start_balance)
+    # accounts come back ordered by id, so account_summaries keeps a stable order without re-sorting
+    start_balance = 0
     account_summaries = []
+    this_get = this_by_acc.get
+    next_get = next_by_acc.get
     for a in accounts:
-        acc_id = int(a.id)
-        start = int(a.balance_yen) if _account_active_on(a, this_first) else 0
-        this_net_acc = this_by_acc[acc_id]
-        next_net_acc = next_by_acc[acc_id]
+        start = a.balance_yen if _account_active_on(a, this_first) else 0
+        if a.user_id == 1:
+            start_balance += start
+        this_net_acc = this_get(a.id, 0)
+        next_net_acc = next_get(a.id, 0)
 
         account_summaries.append(
             {
-                "id": acc_id,
+                "id": a.id,
                 "name": a.name,
                 "start": start,
                 "this_net": this_net_acc,
@@ -707,8 +848,14 @@ def page_index(request: Request, db: Session = Depends(get_db)):
             }
         )
 
-    # keep output order stable (by account id)
-    account_summaries.sort(key=lambda x: x["id"])
+    # month totals come from the per-account aggregates; next2 is only needed as a sum
+    this_net = sum(this_by_acc.values())
+    next_net = sum(next_by_acc.values())
+    next2_net = crud.net_between(db, 1, next2_first, next2_last)
+
+    free_this = start_balance + this_net
+    free_next = start_balance + this_net + next_net
+    free_next2 = start_balance + this_net + next_net + next2_net
 
     forecast = forecast_by_account_daily(db, user_id=1, start=this_first, end=next_last)
     total_series = list((forecast or {}).get("total_series") or [])
@@ -727,29 +874,41 @@ def page_index(request: Request, db: Session = Depends(get_db)):
 
     # --- card section (phase 1) ---
     cards = db.query(Card).order_by(Card.id.asc()).all()
+    # the templates only need card_id; names are looked up here instead of joining Card per row
+    card_name_by_id = {int(c.id): c.name for c in cards}
 
+    # read-only lists: select just the columns the partials render (rows keep attribute access)
     card_transactions = (
-        db.query(CardTransaction)
-        .options(joinedload(CardTransaction.card))
+        db.query(
+            CardTransaction.id,
+            CardTransaction.card_id,
+            CardTransaction.date,
+            CardTransaction.amount_yen,
+            CardTransaction.merchant,
+        )
         .order_by(CardTransaction.date.desc(), CardTransaction.id.desc())
         .limit(50)
         .all()
     )
     card_revolvings = (
         db.query(CardRevolving)
-        .options(joinedload(CardRevolving.card))
         .order_by(CardRevolving.id.desc())
         .all()
     )
     card_installments = (
         db.query(CardInstallment)
-        .options(joinedload(CardInstallment.card))
         .order_by(CardInstallment.id.desc())
         .all()
     )
 
     oneoffs = (
-        db.query(CashflowEvent)
+        db.query(
+            CashflowEvent.id,
+            CashflowEvent.date,
+            CashflowEvent.amount_yen,
+            CashflowEvent.account_id,
+            CashflowEvent.description,
+        )
         .filter(CashflowEvent.user_id == 1, CashflowEvent.source == "oneoff")
         .order_by(CashflowEvent.date.desc(), CashflowEvent.id.desc())
         .limit(30)
@@ -757,97 +916,56 @@ def page_index(request: Request, db: Session = Depends(get_db)):
     )
 
     # account_id -> display label (name(kind))
-    acc_label = {int(a.id): f"{a.name} ({getattr(a, 'kind', 'bank')})" for a in accounts}
-
-    # load recent transfer events (bank/debit)
-    transfer_events = (
-        db.query(CashflowEvent)
-        .filter(CashflowEvent.user_id == 1)
-        .filter(CashflowEvent.source == "transfer")
-        .filter(CashflowEvent.transfer_id.isnot(None))
-        .order_by(CashflowEvent.date.desc(), CashflowEvent.id.desc())
-        .limit(80)  # one transfer is two rows, so fetch a bit more
-        .all()
-    )
-
-    # group by transfer_id, then build one item from from/to pair
-    group = {}
-    for e in transfer_events:
-        tid = e.transfer_id
-        if tid not in group:
-            group[tid] = {"evs": [], "date": e.date}
-        group[tid]["evs"].append(e)
-
-    transfers = []
-    # sort by date desc
-    for tid, g in sorted(group.items(), key=lambda kv: kv[1]["date"], reverse=True):
-        evs = g["evs"]
-
-        # from is negative side, to is positive side
-        ev_from = next((x for x in evs if int(x.amount_yen) < 0), None)
-        ev_to = next((x for x in evs if int(x.amount_yen) > 0), None)
-
-        # skip incomplete pairs (defensive against broken data)
-        if not ev_from or not ev_to:
-            continue
-
-        amt = int(ev_to.amount_yen)
-
-        # method is not persisted, so use a temporary label
+    acc_label = {int(a.id): f"{a.name} ({a.kind or 'bank'})" for a in accounts}
 
-        method = "transfer"
-
-        transfers.append(
-            {
-                "transfer_id": tid,
-                "id": ev_to.id,  # representative id for display (to-side)
-                "date": ev_to.date,
-                "method": method,
-                "amount_yen": amt,
-                "from_id": int(ev_from.account_id),
-                "to_id": int(ev_to.account_id),
-                "from_label": acc_label.get(int(ev_from.account_id), f"ID:{ev_from.account_id}"),
-                "to_label": acc_label.get(int(ev_to.account_id), f"ID:{ev_to.account_id}"),
-            }
-        )
-
-        if len(transfers) >= 30:
-            break
-
-    # accounts -> display label (name(kind))
-    acc_label = {int(a.id): f"{a.name} ({getattr(a, 'kind', 'bank')})" for a in accounts}
-
-    # parse "charge to account_id=123" from note
-    charge_re = re.compile(r"charge to account_id=(\d+)")
+    # recent transfers, already paired from/to in SQL
+    # method is not persisted, so use a temporary label
+    transfers = [
+        {
+            "transfer_id": r.transfer_id,
+            "id": r.id,  # representative id for display (to-side)
+            "date": r.date,
+            "method": "transfer",
+            "amount_yen": int(r.amount_yen),
+            "from_id": int(r.from_id),
+            "to_id": int(r.to_id),
+            "from_label": acc_label.get(int(r.from_id), f"ID:{r.from_id}"),
+            "to_label": acc_label.get(int(r.to_id), f"ID:{r.to_id}"),
+        }
+        for r in crud.list_transfer_pairs(db, 1, limit=30)
+    ]
 
     # load recent card charge rows
-    charge_txs = (
-        db.query(CardTransaction)
-        .options(joinedload(CardTransaction.card))
-        .filter(CardTransaction.note.isnot(None))
-        .filter(CardTransaction.note.like("charge to account_id=%"))
+    charge_rows = (
+        db.query(
+            CardTransaction.id,
+            CardTransaction.date,
+            CardTransaction.amount_yen,
+            CardTransaction.card_id,
+            CardTransaction.charge_to_account_id.label("to_id"),
+        )
+        .filter(CardTransaction.charge_to_account_id.isnot(None))
         .order_by(CardTransaction.date.desc(), CardTransaction.id.desc())
         .limit(30)
         .all()
     )
 
     card_charges = []
-    for tx in charge_txs:
-        m = charge_re.search(tx.note or "")
-        to_id = int(m.group(1)) if m else None
+    for tx in charge_rows:
+        to_id = int(tx.to_id) if tx.to_id else None
         card_charges.append(
             {
                 "id": tx.id,
                 "date": tx.date,
                 "amount_yen": int(tx.amount_yen),
                 "card_id": int(tx.card_id) if tx.card_id else None,
-                "card_name": tx.card.name if tx.card else "-",
+                "card_name": card_name_by_id.get(int(tx.card_id), "-") if tx.card_id else "-",
                 "to_account_id": to_id,
                 "to_label": acc_label.get(to_id, f"ID:{to_id}" if to_id else "-"),
             }
         )
 
-    return templates.TemplateResponse(
+    response = templates.TemplateResponse(
         "index.html",
         {
             "request": request,
@@ -884,10 +1002,14 @@ def page_index(request: Request, db: Session = Depends(get_db)):
             "today": today,
         },
     )
+    # only the current date/version entry is ever read again
+    _INDEX_PAGE_CACHE.clear()
+    _INDEX_PAGE_CACHE[cache_key] = response.body
+    return response
 
 
 # API: list (JSON)
-@app.get("/api/subscriptions", response_model=list[SubscriptionOut])
+@app.get("/api/subscriptions", response_model=list[SubscriptionOut], response_class=ORJSONResponse)
 def api_list_subscriptions(db: Session = Depends(get_db)):
     return crud.list_subscriptions(db)
 
@@ -1014,7 +1136,7 @@ def update_subscription(
     start_d = _parse_required_date(effective_start_date, "effective_start_date")
     end_d = _parse_optional_date(effective_end_date, "effective_end_date")
     _ensure_effective_range(start_d, end_d, "subscription")
-    sub = db.query(Subscription).filter(Subscription.id == sub_id).first()
+    sub = db.get(Subscription, sub_id)
     if sub:
         sub.name = name
         sub.amount_yen = int(amount_yen)
@@ -1173,7 +1295,7 @@ def update_variable_recurring(
     end_d = _parse_optional_date(effective_end_date, "effective_end_date")
     _ensure_effective_range(start_d, end_d, "variable recurring payment")
 
-    item = db.query(VariableRecurringPayment).filter(VariableRecurringPayment.id == int(payment_id)).first()
+    item = db.get(VariableRecurringPayment, int(payment_id))
     if item:
         item.name = name
         item.estimated_amount_yen = abs(int(estimated_amount_yen or 0))
@@ -1209,7 +1331,7 @@ def confirm_variable_recurring(
     confirmed_amount_yen: int = Form(...),
     db: Session = Depends(get_db),
 ):
-    item = db.query(VariableRecurringPayment).filter(VariableRecurringPayment.id == int(payment_id)).first()
+    item = db.get(VariableRecurringPayment, int(payment_id))
     if item is None:
         raise HTTPException(status_code=404, detail="variable recurring payment not found")
 
@@ -1311,17 +1433,17 @@ def add_plan(
     elif payment_method == "card":
         if not card_i:
             raise HTTPException(status_code=400, detail="card_id is required for card payment")
-        card = db.query(Card).filter(Card.id == card_i).one_or_none()
+        card = db.execute(select(Card.payment_account_id).where(Card.id == card_i)).first()
         if card is None:
             raise HTTPException(status_code=400, detail="card not found")
         account_i = int(card.payment_account_id)
 
     if start_date:
-        sd = datetime.strptime(start_date, "%Y-%m-%d").date()
+        sd = date.fromisoformat(start_date)
     else:
         sd = date.today()
     if end_date:
-        ed = datetime.strptime(end_date, "%Y-%m-%d").date()
+        ed = date.fromisoformat(end_date)
     else:
         ed = None
     crud.create_plan(
@@ -1357,7 +1479,7 @@ def update_account(
     end_d = _parse_optional_date(effective_end_date, "effective_end_date")
     _ensure_effective_range(start_d, end_d, "account")
 
-    acc = db.query(Account).filter(Account.id == account_id).first()
+    acc = db.get(Account, account_id)
     if acc:
         acc.name = name
         acc.balance_yen = int(balance_yen)
@@ -1371,7 +1493,7 @@ def update_account(
 @app.post("/accounts/{account_id}/delete")
 def delete_account(account_id: int, db: Session = Depends(get_db)):
     # delete when record exists
-    acc = db.query(Account).filter(Account.id == account_id).first()
+    acc = db.get(Account, account_id)
     if acc:
         db.delete(acc)
         db.commit()
@@ -1429,7 +1551,7 @@ def update_plan(
         elif payment_method == "card":
             if not card_i:
                 raise HTTPException(status_code=400, detail="card_id is required for card payment")
-            card = db.query(Card).filter(Card.id == card_i).one_or_none()
+            card = db.execute(select(Card.payment_account_id).where(Card.id == card_i)).first()
             if card is None:
                 raise HTTPException(status_code=400, detail="card not found")
             account_i = int(card.payment_account_id)
@@ -1445,9 +1567,9 @@ def update_plan(
         p.interval_months = int(interval_i)
         p.month = int(month_i)
         if start_date:
-            p.start_date = datetime.strptime(start_date, "%Y-%m-%d").date()
+            p.start_date = date.fromisoformat(start_date)
         if end_date:
-            p.end_date = datetime.strptime(end_date, "%Y-%m-%d").date()
+            p.end_date = date.fromisoformat(end_date)
         else:
             p.end_date = None
         db.commit()
@@ -1459,7 +1581,7 @@ def delete_plan(plan_id: int, db: Session = Depends(get_db)):
     crud.delete_plan(db, plan_id=plan_id, user_id=1)
     return RedirectResponse(url="/", status_code=303)
 
-@app.get("/api/forecast/accounts")
+@app.get("/api/forecast/accounts", response_class=ORJSONResponse)
 def api_forecast_accounts(
     danger_threshold_yen: int = Query(0),
     db: Session = Depends(get_db),
@@ -1468,18 +1590,14 @@ def api_forecast_accounts(
 
     # from this month start to next month end
     this_first, this_last = month_range(today)
-    if this_first.month == 12:
-        next_first = date(this_first.year + 1, 1, 1)
-    else:
-        next_first = date(this_first.year, this_first.month + 1, 1)
-    next_first, next_last = month_range(next_first)
+    next_first, next_last = month_range(next_month_first(this_first))
 
     return forecast_by_account_events(
         db, user_id=1, start=this_first, end=next_last, danger_threshold_yen=danger_threshold_yen
     )
 
 
-@app.get("/api/reports/monthly")
+@app.get("/api/reports/monthly", response_class=ORJSONResponse)
 def api_monthly_report(
     month: str = Query(..., description="YYYY-MM"),
     db: Session = Depends(get_db),
@@ -1511,14 +1629,14 @@ def download_monthly_report_pdf(
     )
 
 
-@app.get("/api/cards/merchant-pie")
+@app.get("/api/cards/merchant-pie", response_class=ORJSONResponse)
 def api_card_merchant_pie(
     card_id: int = Query(..., ge=1),
     withdraw_month: str = Query(...),
     top_n: int = Query(8, ge=3, le=20),
     db: Session = Depends(get_db),
 ):
-    card = db.query(Card).filter(Card.id == int(card_id)).one_or_none()
+    card = db.get(Card, int(card_id))
     if card is None:
         raise HTTPException(status_code=404, detail="card not found")
 
@@ -1545,7 +1663,7 @@ def api_card_merchant_pie(
         rows = []
     else:
         rows = (
-            db.query(CardTransaction.merchant, CardTransaction.amount_yen, CardTransaction.note)
+            db.query(CardTransaction.merchant, CardTransaction.amount_yen, CardTransaction.charge_to_account_id)
             .filter(CardTransaction.card_id == int(card_id))
             .filter(CardTransaction.date >= analyzed_start, CardTransaction.date <= analyzed_end)
             .all()
@@ -1553,23 +1671,15 @@ def api_card_merchant_pie(
 
     account_names = {int(a.id): a.name for a in db.query(Account).all()}
 
-    def _charge_label_from_note(note: str | None) -> str | None:
-        s = (note or "").strip()
-        m = re.search(r"charge to account_id=(\d+)", s)
-        if not m:
-            return None
-        aid = int(m.group(1))
-        return f"\u30c1\u30e3\u30fc\u30b8: {account_names.get(aid, f'ID:{aid}')}"
-
     totals: dict[str, int] = {}
     total_yen = 0
-    for merchant, amount, note in rows:
+    for merchant, amount, charge_to in rows:
         amount_i = abs(int(amount or 0))
         if amount_i <= 0:
             continue
-        charge_label = _charge_label_from_note(note)
-        if charge_label:
-            name = charge_label
+        if charge_to is not None:
+            aid = int(charge_to)
+            name = f"\u30c1\u30e3\u30fc\u30b8: {account_names.get(aid, f'ID:{aid}')}"
         else:
             name = (merchant or "").strip() or "(\u672a\u8a2d\u5b9a)"
         totals[name] = totals.get(name, 0) + amount_i
@@ -1666,7 +1776,7 @@ def update_card(
     end_d = _parse_optional_date(effective_end_date, "effective_end_date")
     _ensure_effective_range(start_d, end_d, "card")
 
-    c = db.query(Card).filter(Card.id == card_id).first()
+    c = db.get(Card, card_id)
     if c:
         c.name = name
         c.closing_day = int(closing_day)
@@ -1681,7 +1791,21 @@ def update_card(
 
 @app.post("/cards/{card_id}/delete")
 def delete_card(card_id: int, db: Session = Depends(get_db)):
-    db.query(Card).filter(Card.id == card_id).delete(synchronize_session=False)
+    # a bulk DELETE skips the ORM cascade, so remove child rows explicitly in the same transaction
+    for child in (CardTransaction, CardStatement, CardRevolving, CardInstallment):
+        db.execute(
+            delete(child)
+            .where(child.card_id == card_id)
+            .execution_options(synchronize_session=False)
+        )
+    # import batches only remember which card they targeted; keep their history, drop the reference
+    db.execute(
+        update(ImportBatch)
+        .where(ImportBatch.card_id == card_id)
+        .values(card_id=None)
+        .execution_options(synchronize_session=False)
+    )
+    db.execute(delete(Card).where(Card.id == card_id).execution_options(synchronize_session=False))
     db.commit()
     rebuild_events_scheduler(db, user_id=1)
     return RedirectResponse(url="/", status_code=303)
@@ -1696,8 +1820,7 @@ def create_card_revolving(
     note: str | None = Form(None),
     db: Session = Depends(get_db),
 ):
-    card = db.query(Card).filter(Card.id == int(card_id)).one_or_none()
-    if card is None:
+    if not _card_exists(db, int(card_id)):
         raise HTTPException(status_code=400, detail="card not found")
 
     try:
@@ -1736,11 +1859,10 @@ def update_card_revolving(
     note: str | None = Form(None),
     db: Session = Depends(get_db),
 ):
-    card = db.query(Card).filter(Card.id == int(card_id)).one_or_none()
-    if card is None:
+    if not _card_exists(db, int(card_id)):
         raise HTTPException(status_code=400, detail="card not found")
 
-    rv = db.query(CardRevolving).filter(CardRevolving.id == revolving_id).first()
+    rv = db.get(CardRevolving, revolving_id)
     if rv:
         try:
             month_first = _parse_month_start(start_month)
@@ -1796,8 +1918,7 @@ def create_card_installment(
     note: str | None = Form(None),
     db: Session = Depends(get_db),
 ):
-    card = db.query(Card).filter(Card.id == int(card_id)).one_or_none()
-    if card is None:
+    if not _card_exists(db, int(card_id)):
         raise HTTPException(status_code=400, detail="card not found")
 
     try:
@@ -1834,11 +1955,10 @@ def update_card_installment(
     note: str | None = Form(None),
     db: Session = Depends(get_db),
 ):
-    card = db.query(Card).filter(Card.id == int(card_id)).one_or_none()
-    if card is None:
+    if not _card_exists(db, int(card_id)):
         raise HTTPException(status_code=400, detail="card not found")
 
-    inst = db.query(CardInstallment).filter(CardInstallment.id == installment_id).first()
+    inst = db.get(CardInstallment, installment_id)
     if inst:
         try:
             month_first = _parse_month_start(start_month)
@@ -1890,70 +2010,64 @@ def create_card_transaction(
     date_: date = Form(..., alias="date"),
     amount_yen: int = Form(...),
     merchant: str | None = Form(None),
+    db: Session = Depends(get_db),
 ):
-    db = SessionLocal()
-    try:
-        # guard: ensure card exists to avoid crashes
-        card = db.query(Card).filter(Card.id == card_id).one_or_none()
-        if card is None:
-            # keep UX simple: redirect to top when card is not found
-            return RedirectResponse(url="/", status_code=303)
+    # guard: ensure card exists to avoid crashes
+    if not _card_exists(db, card_id):
+        # keep UX simple: redirect to top when card is not found
+        return RedirectResponse(url="/", status_code=303)
 
-        t = CardTransaction(
+    db.execute(
+        insert(CardTransaction).values(
             card_id=card_id,
             date=date_,
             amount_yen=int(amount_yen),
             merchant=(merchant or None),
         )
-        db.add(t)
-        db.commit()
-    finally:
-        db.close()
-
+    )
+    db.commit()
     return RedirectResponse(url="/", status_code=303)
 
 
 @app.post("/card-transactions/import-csv")
-async def import_card_transactions_csv(
+def import_card_transactions_csv(
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
 ):
-    content = await file.read()
-    rows = _csv_dict_rows(content)
-
-    required = {"yyyy/mm/dd", "title", "price", "card"}
-    headers = {h.strip().lower() for h in (rows[0].keys() if rows else [])}
-    if rows and not required.issubset(headers):
-        raise HTTPException(
-            status_code=400,
-            detail="CSV headers must include: yyyy/mm/dd, title, price, card",
-        )
-
-    created = 0
-    for r in rows:
-        row = {str(k).strip().lower(): (v or "").strip() for k, v in r.items()}
-        if not any(row.values()):
-            continue
-        try:
-            tx_date = _parse_csv_date(row.get("yyyy/mm/dd", ""))
-            merchant = row.get("title", "")
-            amount = abs(_parse_csv_amount(row.get("price", "")))
-            card_id = _resolve_card_id(db, row.get("card", ""))
-        except ValueError as e:
-            raise HTTPException(status_code=400, detail=f"card csv parse error: {e}")
-
-        db.add(
-            CardTransaction(
-                card_id=card_id,
-                date=tx_date,
-                amount_yen=amount,
-                merchant=merchant or None,
+    with _csv_dict_reader(
+        file.file,
+        {"yyyy/mm/dd", "title", "price", "card"},
+        "CSV headers must include: yyyy/mm/dd, title, price, card",
+    ) as reader, db.begin():
+        # one explicit transaction per file: index lookup, batched inserts, single COMMIT
+        card_index = _load_card_index(db)
+        to_insert: list[dict] = []
+        for r in reader:
+            row = {str(k).strip().lower(): (v or "").strip() for k, v in r.items()}
+            if not any(row.values()):
+                continue
+            try:
+                tx_date = _parse_csv_date(row.get("yyyy/mm/dd", ""))
+                merchant = row.get("title", "")
+                amount = abs(_parse_csv_amount(row.get("price", "")))
+                card_id = _resolve_card_id(card_index, row.get("card", ""))
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=f"card csv parse error: {e}")
+
+            to_insert.append(
+                {
+                    "card_id": card_id,
+                    "date": tx_date,
+                    "amount_yen": amount,
+                    "merchant": merchant or None,
+                }
             )
-        )
-        created += 1
+            if len(to_insert) >= CSV_INSERT_BATCH_SIZE:
+                db.execute(insert(CardTransaction), to_insert)
+                to_insert.clear()
 
-    if created > 0:
-        db.commit()
+        if to_insert:
+            db.execute(insert(CardTransaction), to_insert)
     return RedirectResponse(url="/", status_code=303)
 
 
@@ -1966,25 +2080,20 @@ def update_card_transaction(
     merchant: str | None = Form(None),
     db: Session = Depends(get_db),
 ):
-    t = db.query(CardTransaction).filter(CardTransaction.id == tx_id).first()
-    if t:
-        t.card_id = int(card_id)
-        t.date = date_
-        t.amount_yen = int(amount_yen)
-        t.merchant = merchant or None
-        db.commit()
+    db.execute(
+        update(CardTransaction)
+        .where(CardTransaction.id == tx_id)
+        .values(card_id=int(card_id), date=date_, amount_yen=int(amount_yen), merchant=merchant or None)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
     return RedirectResponse(url="/", status_code=303)
 
 
 @app.post("/card-transactions/{tx_id}/delete")
-def delete_card_transaction(tx_id: int):
-    db = SessionLocal()
-    try:
-        db.query(CardTransaction).filter(CardTransaction.id == tx_id).delete(synchronize_session=False)
-        db.commit()
-    finally:
-        db.close()
-
+def delete_card_transaction(tx_id: int, db: Session = Depends(get_db)):
+    db.query(CardTransaction).filter(CardTransaction.id == tx_id).delete(synchronize_session=False)
+    db.commit()
     return RedirectResponse(url="/", status_code=303)
 
 
@@ -1997,7 +2106,13 @@ def bulk_delete_card_transactions(
     if not unique_ids:
         return RedirectResponse(url="/", status_code=303)
 
-    db.query(CardTransaction).filter(CardTransaction.id.in_(unique_ids)).delete(synchronize_session=False)
+    # keep each IN (...) under driver parameter limits
+    for chunk in _chunked(unique_ids, IN_CLAUSE_CHUNK_SIZE):
+        db.execute(
+            delete(CardTransaction)
+            .where(CardTransaction.id.in_(chunk))
+            .execution_options(synchronize_session=False)
+        )
     db.commit()
     return RedirectResponse(url="/", status_code=303)
 
@@ -2017,74 +2132,82 @@ def create_oneoff(
     else:
         amt = abs(amt)
 
-    ev = CashflowEvent(
-        user_id=1,
-        date=date_,
-        account_id=int(account_id),
-        amount_yen=amt,
-        plan_id=None,
-        description=description,
-        source="oneoff",
-        status="expected",
+    # the created row is not read back, so skip the ORM unit of work
+    db.execute(
+        insert(CashflowEvent).values(
+            user_id=1,
+            date=date_,
+            account_id=int(account_id),
+            amount_yen=amt,
+            plan_id=None,
+            description=description,
+            source="oneoff",
+            status="expected",
+        )
     )
-    db.add(ev)
     db.commit()
     return RedirectResponse(url="/", status_code=303)
 
 
 @app.post("/oneoff/import-csv")
-async def import_oneoff_csv(
+def import_oneoff_csv(
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
 ):
-    content = await file.read()
-    rows = _csv_dict_rows(content)
-
-    required = {"yyyy/mm/dd", "type", "price", "account", "memo"}
-    headers = {h.strip().lower() for h in (rows[0].keys() if rows else [])}
-    if rows and not required.issubset(headers):
-        raise HTTPException(
-            status_code=400,
-            detail="CSV headers must include: yyyy/mm/dd, type, price, account, memo",
-        )
-
-    created = 0
-    for r in rows:
-        row = {str(k).strip().lower(): (v or "").strip() for k, v in r.items()}
-        if not any(row.values()):
-            continue
-        try:
-            ev_date = _parse_csv_date(row.get("yyyy/mm/dd", ""))
-            direction = _parse_direction(row.get("type", ""))
-            account_id = _resolve_account_id(db, row.get("account", ""))
-            amount = _parse_csv_amount(row.get("price", ""))
-            memo = row.get("memo", "")
-        except ValueError as e:
-            raise HTTPException(status_code=400, detail=f"oneoff csv parse error: {e}")
-
-        amt = abs(amount)
-        if direction == "expense":
-            amt = -amt
-
-        db.add(
-            CashflowEvent(
-                user_id=1,
-                date=ev_date,
-                account_id=account_id,
-                amount_yen=amt,
-                plan_id=None,
-                description=memo or None,
-                source="oneoff",
-                status="expected",
+    with _csv_dict_reader(
+        file.file,
+        {"yyyy/mm/dd", "type", "price", "account", "memo"},
+        "CSV headers must include: yyyy/mm/dd, type, price, account, memo",
+    ) as reader, db.begin():
+        # one explicit transaction per file: index lookup, batched inserts, single COMMIT
+        account_index = _load_account_index(db)
+        to_insert: list[dict] = []
+        for r in reader:
+            row = {str(k).strip().lower(): (v or "").strip() for k, v in r.items()}
+            if not any(row.values()):
+                continue
+            try:
+                ev_date = _parse_csv_date(row.get("yyyy/mm/dd", ""))
+                direction = _parse_direction(row.get("type", ""))
+                account_id = _resolve_account_id(account_index, row.get("account", ""))
+                amount = _parse_csv_amount(row.get("price", ""))
+                memo = row.get("memo", "")
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=f"oneoff csv parse error: {e}")
+
+            amt = abs(amount)
+            if direction == "expense":
+                amt = -amt
+
+            to_insert.append(
+                {
+                    "user_id": 1,
+                    "date": ev_date,
+                    "account_id": account_id,
+                    "amount_yen": amt,
+                    "plan_id": None,
+                    "description": memo or None,
+                    "source": "oneoff",
+                    "status": "expected",
+                }
             )
-        )
-        created += 1
+            if len(to_insert) >= CSV_INSERT_BATCH_SIZE:
+                db.execute(insert(CashflowEvent), to_insert)
+                to_insert.clear()
 
-    if created > 0:
-        db.commit()
+        if to_insert:
+            db.execute(insert(CashflowEvent), to_insert)
     return RedirectResponse(url="/", status_code=303)
 
 
+def _parse_text_import_row(row: dict) -> tuple[date, str, int]:
+    return (
+        parse_flexible_date(str(row.get("date", ""))),
+        normalize_title(str(row.get("title", ""))),
+        int(row.get("price", 0)),
+    )
+
+
 @app.post("/oneoff/import-text")
 def import_oneoff_text(
     text: str = Form(...),
@@ -2092,29 +2215,37 @@ def import_oneoff_text(
     default_direction: str = Form("auto"),  # auto / expense / income
     db: Session = Depends(get_db),
 ):
-    account = db.query(Account).filter(Account.id == int(account_id)).one_or_none()
-    if account is None:
-        raise HTTPException(status_code=400, detail="account not found")
-
     mode = str(default_direction or "auto").strip().lower()
     if mode not in ("auto", "expense", "income"):
         raise HTTPException(status_code=400, detail="default_direction must be auto/expense/income")
 
+    # Parse before any DB access so empty/broken pastes never open a transaction.
     rows, warnings, errors = parse_card_text_preview(text or "")
     if errors:
         raise HTTPException(status_code=400, detail=f"oneoff text parse error: {' | '.join(errors[:5])}")
     if not rows:
         raise HTTPException(status_code=400, detail="no rows parsed from text")
 
-    created = 0
+    if not _account_exists(db, int(account_id)):
+        raise HTTPException(status_code=400, detail="account not found")
+
+    # Validate every row before touching the session so one bad row never leaves
+    # a partial import behind; the first few problems are listed with a count of the rest.
+    parsed: list[tuple[date, str, int]] = []
+    row_errors: list[str] = []
     for i, row in enumerate(rows, start=1):
         try:
-            ev_date = parse_flexible_date(str(row.get("date", "")))
-            title = normalize_title(str(row.get("title", "")))
-            raw_price = int(row.get("price", 0))
+            parsed.append(_parse_text_import_row(row))
         except Exception as e:
-            raise HTTPException(status_code=400, detail=f"row {i} parse error: {e}")
-
+            row_errors.append(f"row {i} parse error: {e}")
+    if row_errors:
+        detail = " | ".join(row_errors[:5])
+        if len(row_errors) > 5:
+            detail += f" | ... and {len(row_errors) - 5} more"
+        raise HTTPException(status_code=400, detail=detail)
+
+    mappings: list[dict] = []
+    for ev_date, title, raw_price in parsed:
         base = abs(raw_price)
         if mode == "expense":
             signed_amount = -base
@@ -2124,21 +2255,22 @@ def import_oneoff_text(
             # Auto mode: positive text amount as expense, negative text amount as income.
             signed_amount = base if raw_price < 0 else -base
 
-        db.add(
-            CashflowEvent(
-                user_id=1,
-                date=ev_date,
-                account_id=int(account_id),
-                amount_yen=signed_amount,
-                plan_id=None,
-                description=title,
-                source="oneoff",
-                status="expected",
-            )
+        mappings.append(
+            {
+                "user_id": 1,
+                "date": ev_date,
+                "account_id": int(account_id),
+                "amount_yen": signed_amount,
+                "plan_id": None,
+                "description": title,
+                "source": "oneoff",
+                "status": "expected",
+            }
         )
-        created += 1
 
+    created = len(mappings)
     if created > 0:
+        db.execute(insert(CashflowEvent), mappings)
         db.commit()
 
     # Keep warnings observable in server logs; import still succeeds.
@@ -2151,37 +2283,43 @@ def import_oneoff_text(
 @app.post("/oneoff/{event_id}/update")
 def update_oneoff(
     event_id: int,
-    date_: date = Form(..., alias="date"),
-    account_id: int = Form(...),
-    amount_yen: int = Form(...),
-    direction: str = Form(...),
-    description: str = Form(...),
+    form: Annotated[OneoffUpdateForm, Form()],
     db: Session = Depends(get_db),
 ):
-    ev = db.query(CashflowEvent).filter(
-        CashflowEvent.id == event_id,
-        CashflowEvent.source == "oneoff",
-    ).first()
-    if ev:
-        amt = int(amount_yen)
-        if direction == "expense":
-            amt = -abs(amt)
-        else:
-            amt = abs(amt)
-        ev.date = date_
-        ev.account_id = int(account_id)
-        ev.amount_yen = amt
-        ev.description = description
-        db.commit()
+    amt = int(form.amount_yen)
+    if form.direction == "expense":
+        amt = -abs(amt)
+    else:
+        amt = abs(amt)
+
+    db.execute(
+        update(CashflowEvent)
+        .where(
+            CashflowEvent.id == event_id,
+            CashflowEvent.source == "oneoff",
+        )
+        .values(
+            date=form.date_,
+            account_id=int(form.account_id),
+            amount_yen=amt,
+            description=form.description,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
     return RedirectResponse(url="/", status_code=303)
 
 
 @app.post("/oneoff/{event_id}/delete")
 def delete_oneoff(event_id: int, db: Session = Depends(get_db)):
-    db.query(CashflowEvent).filter(
-        CashflowEvent.id == event_id,
-        CashflowEvent.source == "oneoff",
-    ).delete(synchronize_session=False)
+    db.execute(
+        delete(CashflowEvent)
+        .where(
+            CashflowEvent.id == event_id,
+            CashflowEvent.source == "oneoff",
+        )
+        .execution_options(synchronize_session=False)
+    )
     db.commit()
     return RedirectResponse(url="/", status_code=303)
 
@@ -2195,119 +2333,124 @@ def bulk_delete_oneoff(
     if not unique_ids:
         return RedirectResponse(url="/", status_code=303)
 
-    db.query(CashflowEvent).filter(
-        CashflowEvent.id.in_(unique_ids),
-        CashflowEvent.source == "oneoff",
-    ).delete(synchronize_session=False)
+    # keep each IN (...) under driver parameter limits
+    for chunk in _chunked(unique_ids, IN_CLAUSE_CHUNK_SIZE):
+        db.execute(
+            delete(CashflowEvent)
+            .where(
+                CashflowEvent.id.in_(chunk),
+                CashflowEvent.source == "oneoff",
+            )
+            .execution_options(synchronize_session=False)
+        )
     db.commit()
     return RedirectResponse(url="/", status_code=303)
 
 
 @app.post("/transfer")
 def create_transfer(
+    form: Annotated[TransferForm, Form()],
     db: Session = Depends(get_db),
-    date_: date = Form(..., alias="date"),
-    from_account_id: int = Form(...),
-    to_account_id: int = Form(...),
-    amount_yen: int = Form(...),
-    method: str = Form(...),  # "bank" / "debit" / "card"
-    description: str = Form("郢昶・ﾎ慕ｹ晢ｽｼ郢ｧ・ｸ"),
-    card_id: int | None = Form(None),
 ):
-    amt = abs(int(amount_yen))
+    amt = abs(int(form.amount_yen))
     tid = str(uuid4())
 
-    # to陋幢ｽｴ邵ｺ・ｯ陟｢繝ｻ笘・+繝ｻ蝓滂ｽｮ遏ｩ・ｫ蛟･窶ｲ陟・干竏ｴ郢ｧ蜈ｷ・ｼ繝ｻ
-    ev_to = CashflowEvent(
-        user_id=1,
-        date=date_,
-        account_id=int(to_account_id),
-        amount_yen=amt,
-        plan_id=None,
-        description=f"{description} IN",
-        source="transfer",
-        transfer_id=tid,
-        status="expected",
-    )
-    db.add(ev_to)
+    # to side always receives +amount
+    event_rows: list[dict] = [
+        {
+            "user_id": 1,
+            "date": form.date_,
+            "account_id": int(form.to_account_id),
+            "amount_yen": amt,
+            "plan_id": None,
+            "description": f"{form.description} IN",
+            "source": "transfer",
+            "transfer_id": tid,
+            "status": "expected",
+        }
+    ]
 
-    if method in ("bank", "debit"):
-        # from陋幢ｽｴ邵ｺ・ｯ陷ｷ譴ｧ蠕狗ｸｺ・ｫ -繝ｻ蝓滂ｽｮ遏ｩ・ｫ蛟･ﾂｰ郢ｧ逕ｻ・ｸ蟶呻ｽ九・繝ｻ
-        ev_from = CashflowEvent(
-            user_id=1,
-            date=date_,
-            account_id=int(from_account_id),
-            amount_yen=-amt,
-            plan_id=None,
-            description=f"{description} OUT",
-            source="transfer",
-            transfer_id=tid,
-            status="expected",
+    if form.method in ("bank", "debit"):
+        # from side is debited on the same day
+        event_rows.append(
+            {
+                "user_id": 1,
+                "date": form.date_,
+                "account_id": int(form.from_account_id),
+                "amount_yen": -amt,
+                "plan_id": None,
+                "description": f"{form.description} OUT",
+                "source": "transfer",
+                "transfer_id": tid,
+                "status": "expected",
+            }
         )
-        db.add(ev_from)
 
-    elif method == "card":
+    charge_row: dict | None = None
+    if form.method == "card":
         # card charge: do not create immediate minus on from side
         # add CardTransaction and let withdrawal event reduce bank later
-        if not card_id:
+        if not form.card_id:
             return RedirectResponse(url="/", status_code=303)
 
-        tx = CardTransaction(
-            card_id=int(card_id),
-            date=date_,
-            amount_yen=amt,  # expense is positive in card_transactions
-            merchant=description,
-            note=f"charge to account_id={to_account_id}",
-        )
-        db.add(tx)
+        charge_row = {
+            "card_id": int(form.card_id),
+            "date": form.date_,
+            "amount_yen": amt,  # expense is positive in card_transactions
+            "merchant": form.description,
+            "note": f"{CHARGE_NOTE_PREFIX}{form.to_account_id}",
+            "charge_to_account_id": int(form.to_account_id),
+        }
 
-    db.commit()
+    # everything is prepared up front, so the writes share one BEGIN/COMMIT
+    with db.begin():
+        if charge_row is not None:
+            db.execute(insert(CardTransaction).values(**charge_row))
+        db.execute(insert(CashflowEvent), event_rows)
     return RedirectResponse(url="/", status_code=303)
 
 
 @app.post("/transfer/{transfer_id}/update")
 def update_transfer(
     transfer_id: str,
-    date_: date = Form(..., alias="date"),
-    from_account_id: int = Form(...),
-    to_account_id: int = Form(...),
-    amount_yen: int = Form(...),
+    form: Annotated[TransferUpdateForm, Form()],
     db: Session = Depends(get_db),
 ):
-    evs = (
-        db.query(CashflowEvent)
-        .filter(CashflowEvent.user_id == 1)
-        .filter(CashflowEvent.source == "transfer")
-        .filter(CashflowEvent.transfer_id == transfer_id)
-        .all()
+    amt = abs(int(form.amount_yen))
+    pair = (
+        CashflowEvent.user_id == 1,
+        CashflowEvent.source == "transfer",
+        CashflowEvent.transfer_id == transfer_id,
     )
-    if not evs:
-        return RedirectResponse(url="/", status_code=303)
-
-    ev_from = next((x for x in evs if int(x.amount_yen) < 0), None)
-    ev_to = next((x for x in evs if int(x.amount_yen) > 0), None)
-    amt = abs(int(amount_yen))
-
-    if ev_to:
-        ev_to.date = date_
-        ev_to.account_id = int(to_account_id)
-        ev_to.amount_yen = amt
-    if ev_from:
-        ev_from.date = date_
-        ev_from.account_id = int(from_account_id)
-        ev_from.amount_yen = -amt
 
+    # from is the negative side, to is the positive side; each UPDATE touches at most one row
+    db.execute(
+        update(CashflowEvent)
+        .where(*pair, CashflowEvent.amount_yen < 0)
+        .values(date=form.date_, account_id=int(form.from_account_id), amount_yen=-amt)
+        .execution_options(synchronize_session=False)
+    )
+    db.execute(
+        update(CashflowEvent)
+        .where(*pair, CashflowEvent.amount_yen > 0)
+        .values(date=form.date_, account_id=int(form.to_account_id), amount_yen=amt)
+        .execution_options(synchronize_session=False)
+    )
     db.commit()
     return RedirectResponse(url="/", status_code=303)
 
 
 @app.post("/transfer/{transfer_id}/delete")
 def delete_transfer(transfer_id: str, db: Session = Depends(get_db)):
-    db.query(CashflowEvent).filter(
-        CashflowEvent.user_id == 1,
-        CashflowEvent.source == "transfer",
-        CashflowEvent.transfer_id == transfer_id,
-    ).delete(synchronize_session=False)
+    db.execute(
+        delete(CashflowEvent)
+        .where(
+            CashflowEvent.user_id == 1,
+            CashflowEvent.source == "transfer",
+            CashflowEvent.transfer_id == transfer_id,
+        )
+        .execution_options(synchronize_session=False)
+    )
     db.commit()
     return RedirectResponse(url="/", status_code=303)
 
@@ -2315,39 +2458,87 @@ def delete_transfer(transfer_id: str, db: Session = Depends(get_db)):
 @app.post("/card_charges/{tx_id}/update")
 def update_card_charge(
     tx_id: int,
-    date_: date = Form(..., alias="date"),
-    amount_yen: int = Form(...),
-    card_id: int = Form(...),
-    to_account_id: int = Form(...),
+    form: Annotated[CardChargeUpdateForm, Form()],
     db: Session = Depends(get_db),
 ):
-    tx = db.query(CardTransaction).filter(CardTransaction.id == tx_id).first()
-    if tx:
-        tx.date = date_
-        tx.amount_yen = int(amount_yen)
-        tx.card_id = int(card_id)
-        tx.note = f"charge to account_id={to_account_id}"
-        db.commit()
+    db.execute(
+        update(CardTransaction)
+        .where(CardTransaction.id == tx_id)
+        .values(
+            date=form.date_,
+            amount_yen=int(form.amount_yen),
+            card_id=int(form.card_id),
+            note=f"{CHARGE_NOTE_PREFIX}{form.to_account_id}",
+            charge_to_account_id=int(form.to_account_id),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
     return RedirectResponse(url="/", status_code=303)
 
 
 @app.post("/card_charges/{tx_id}/delete")
 def delete_card_charge(tx_id: int, db: Session = Depends(get_db)):
-    db.query(CardTransaction).filter(CardTransaction.id == tx_id).delete(synchronize_session=False)
+    db.execute(
+        delete(CardTransaction)
+        .where(CardTransaction.id == tx_id)
+        .execution_options(synchronize_session=False)
+    )
     db.commit()
     return RedirectResponse(url="/", status_code=303)
 
 
-@app.get("/api/forecast/free")
-def api_forecast_free(db: Session = Depends(get_db)):
-    today = date.today()
-    this_first = today.replace(day=1)
-    next_first = date(this_first.year + (1 if this_first.month == 12 else 0),
-                      1 if this_first.month == 12 else this_first.month + 1,
-                      1)
-    end = month_range(next_first)[1]  # end of next month
+@app.post("/card_charges/bulk-delete")
+def bulk_delete_card_charges(
+    ids: str = Form(""),
+    db: Session = Depends(get_db),
+):
+    unique_ids = _parse_bulk_ids(ids)
+    if not unique_ids:
+        return RedirectResponse(url="/", status_code=303)
+
+    # only charge rows; ordinary card transactions are deleted from their own list
+    for chunk in _chunked(unique_ids, IN_CLAUSE_CHUNK_SIZE):
+        db.execute(
+            delete(CardTransaction)
+            .where(
+                CardTransaction.id.in_(chunk),
+                CardTransaction.charge_to_account_id.isnot(None),
+            )
+            .execution_options(synchronize_session=False)
+        )
+    db.commit()
+    return RedirectResponse(url="/", status_code=303)
 
-    series = forecast_free_daily(db, user_id=1, start=this_first, end=end)
-    return {"series": series}
 
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    # If-None-Match uses weak comparison: a comma-separated list, W/ prefixes ignored, "*" matches anything
+    for tag in (if_none_match or "").split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == etag:
+            return True
+    return False
 
+
+@app.get("/api/forecast/free", response_class=ORJSONResponse)
+def api_forecast_free(request: Request, db: Session = Depends(get_db)):
+    today = date.today()
+    # the stamp is read before the forecast, so the body stored under it is never older than it
+    cache_key = f"1:{today.isoformat()}:{read_data_version(db)}"
+    cached = _FORECAST_FREE_CACHE.get(cache_key)
+    if cached is None:
+        this_first = today.replace(day=1)
+        end = month_range(next_month_first(this_first))[1]  # end of next month
+
+        series = forecast_free_daily(db, user_id=1, start=this_first, end=end)
+        body = orjson.dumps({"series": series})
+        cached = (body, f'"{hashlib.sha1(body).hexdigest()}"')
+        # only the current date/version entry is ever read again
+        _FORECAST_FREE_CACHE.clear()
+        _FORECAST_FREE_CACHE[cache_key] = cached
+
+    body, etag = cached
+    headers = {"Cache-Control": "private, max-age=60", "ETag": etag}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -1,5 +1,5 @@
 from datetime import date
-from sqlalchemy import Integer, String, Date, Column, ForeignKey, UniqueConstraint, DateTime, Text
+from sqlalchemy import Integer, String, Date, Column, ForeignKey, UniqueConstraint, DateTime, Text, Index
 from datetime import datetime
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from .db import Base
@@ -122,6 +122,15 @@ class Plan(Base):
 
 class CashflowEvent(Base):
     __tablename__ = "cashflow_events"
+    __table_args__ = (
+        # oneoff/transfer handlers always filter by source first
+        Index("ix_cashflow_source_transfer", "source", "transfer_id"),
+        Index("ix_cashflow_source_id", "source", "id"),
+        # page_index lists recent oneoff/transfer rows by (date desc, id desc)
+        Index("ix_cashflow_user_source_date_id", "user_id", "source", "date", "id"),
+        # month range scans (page_index, forecast, reports)
+        Index("ix_cashflow_user_date", "user_id", "date"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     user_id: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
@@ -171,6 +180,12 @@ class Card(Base):
 
 class CardTransaction(Base):
     __tablename__ = "card_transactions"
+    __table_args__ = (
+        Index("ix_card_transactions_card_date", "card_id", "date"),
+        # recent-transactions / recent-charges lists order by (date desc, id desc)
+        Index("ix_card_transactions_date_id", "date", "id"),
+        Index("ix_card_transactions_charge_to_account", "charge_to_account_id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     card_id: Mapped[int] = mapped_column(Integer, ForeignKey("cards.id"), nullable=False)
@@ -183,6 +198,9 @@ class CardTransaction(Base):
     merchant: Mapped[str | None] = mapped_column(String(200), nullable=True)
     note: Mapped[str | None] = mapped_column(String(200), nullable=True)
 
+    # クレカチャージ行のチャージ先口座（通常の利用明細は NULL）
+    charge_to_account_id: Mapped[int | None] = mapped_column(Integer, nullable=True)
+
     card = relationship("Card", back_populates="transactions")
 
 
@@ -270,3 +288,12 @@ class ImportedTransaction(Base):
     committed_event_id = Column(Integer, ForeignKey("cashflow_events.id"), nullable=True)
 
     batch = relationship("ImportBatch", back_populates="transactions")
+
+
+class DataVersion(Base):
+    # 読み取りキャッシュ用のデータ世代（id=1 の1行のみ）。
+    # ORM Session 経由の書き込みがあると、同じトランザクション内で version が +1 される（app/db.py）。
+    __tablename__ = "data_version"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
@@ -1,9 +1,10 @@
 from __future__ import annotations
+from collections.abc import Hashable, Mapping
 from dataclasses import dataclass
 from datetime import date, timedelta
 import calendar
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, insert
 
 from app.models import Card, CardTransaction, CardStatement, CashflowEvent
 from app.utils.dates import resolve_day_in_month, last_day_of_month, apply_business_day_rule
@@ -41,6 +42,40 @@ def compute_period_for_withdraw_month(card: Card, withdraw_y: int, withdraw_m: i
     return period_start, period_end, withdraw_date
 
 
+def sum_card_transactions_by_period(
+    db: Session,
+    periods: Mapping[Hashable, tuple[int, date, date]],
+) -> dict[Hashable, int]:
+    """
+    periods: {key: (card_id, period_start, period_end)}
+    カード×日付で GROUP BY した1クエリの結果を Python 側で各期間に振り分け、{key: 利用額合計} を返す。
+    （カード×月ごとに SUM を投げない）
+    """
+    if not periods:
+        return {}
+
+    card_ids = sorted({card_id for card_id, _, _ in periods.values()})
+    lo = min(start for _, start, _ in periods.values())
+    hi = max(end for _, _, end in periods.values())
+
+    rows = (
+        db.query(CardTransaction.card_id, CardTransaction.date, func.sum(CardTransaction.amount_yen))
+        .filter(CardTransaction.card_id.in_(card_ids))
+        .filter(CardTransaction.date >= lo, CardTransaction.date <= hi)
+        .group_by(CardTransaction.card_id, CardTransaction.date)
+        .all()
+    )
+
+    daily_by_card: dict[int, list[tuple[date, int]]] = {}
+    for card_id, d, total in rows:
+        daily_by_card.setdefault(int(card_id), []).append((d, int(total or 0)))
+
+    return {
+        key: sum(total for d, total in daily_by_card.get(card_id, ()) if start <= d <= end)
+        for key, (card_id, start, end) in periods.items()
+    }
+
+
 def upsert_statements_and_events_for_months(
     db: Session,
     user_id: int,
@@ -53,14 +88,31 @@ def upsert_statements_and_events_for_months(
     """
     cards = db.query(Card).all()
 
+    # (card, 引落月) ごとの締め期間・引落日は1回だけ計算して使い回す
+    targets = [
+        (card, *compute_period_for_withdraw_month(card, y, m))
+        for card in cards
+        for y, m in withdraw_months
+    ]
+    totals = sum_card_transactions_by_period(
+        db,
+        {(card.id, wd): (card.id, ps, pe) for card, ps, pe, wd in targets},
+    )
+
     # 既存の card 引落イベントを「算出された withdraw_date」単位で消す
     # 休日後ろ倒しで翌月にずれても確実に消せる
-    withdraw_dates_to_delete: set[date] = set()
-
-    for card in cards:
-        for y, m in withdraw_months:
-            _, _, wd = compute_period_for_withdraw_month(card, y, m)
-            withdraw_dates_to_delete.add(wd)
+    withdraw_dates_to_delete = {wd for _, _, _, wd in targets}
+
+    # 既存 statement は (card_id, withdraw_date) で1回だけまとめて引く
+    existing_stmts: dict[tuple[int, date], CardStatement] = {}
+    if targets:
+        existing_stmts = {
+            (s.card_id, s.withdraw_date): s
+            for s in db.query(CardStatement).filter(
+                CardStatement.card_id.in_(sorted({card.id for card, _, _, _ in targets})),
+                CardStatement.withdraw_date.in_(sorted(withdraw_dates_to_delete)),
+            )
+        }
 
     if withdraw_dates_to_delete:
         db.query(CashflowEvent).filter(
@@ -69,48 +121,46 @@ def upsert_statements_and_events_for_months(
             CashflowEvent.date.in_(sorted(withdraw_dates_to_delete)),
         ).delete(synchronize_session=False)
 
-    for card in cards:
-        for wy, wm in withdraw_months:
-            period_start, period_end, withdraw_date = compute_period_for_withdraw_month(card, wy, wm)
-
-            total = db.query(func.coalesce(func.sum(CardTransaction.amount_yen), 0)).filter(
-                CardTransaction.card_id == card.id,
-                CardTransaction.date >= period_start,
-                CardTransaction.date <= period_end,
-            ).scalar()
-
-            # statement upsert（uq_card_withdraw_date で探す）
-            stmt = db.query(CardStatement).filter(
-                CardStatement.card_id == card.id,
-                CardStatement.withdraw_date == withdraw_date,
-            ).one_or_none()
-
-            if stmt is None:
-                stmt = CardStatement(
-                    card_id=card.id,
-                    period_start=period_start,
-                    period_end=period_end,
-                    amount_yen=int(total or 0),
-                    withdraw_date=withdraw_date,
-                )
-                db.add(stmt)
-            else:
-                stmt.period_start = period_start
-                stmt.period_end = period_end
-                stmt.amount_yen = int(total or 0)
-
-            # 引落イベント生成（amountはマイナス）
-            desc = f"カード引落: {card.name} ({period_start}〜{period_end})"
-            ev = CashflowEvent(
-                user_id=user_id,
-                date=withdraw_date,
-                amount_yen=-int(total or 0),
-                account_id=card.payment_account_id,
-                plan_id=None,
-                description=desc,
-                source="card",
-                status="expected",
-            )
-            db.add(ev)
+    # 新規 statement と引落イベントは dict に溜めて executemany でまとめて INSERT する
+    new_stmts: dict[tuple[int, date], dict] = {}
+    event_rows: list[dict] = []
+
+    for card, period_start, period_end, withdraw_date in targets:
+        total = int(totals.get((card.id, withdraw_date), 0) or 0)
+
+        # statement upsert（uq_card_withdraw_date のキーで引く）
+        key = (card.id, withdraw_date)
+        stmt = existing_stmts.get(key)
+        if stmt is not None:
+            stmt.period_start = period_start
+            stmt.period_end = period_end
+            stmt.amount_yen = total
+        else:
+            new_stmts[key] = {
+                "card_id": card.id,
+                "period_start": period_start,
+                "period_end": period_end,
+                "amount_yen": total,
+                "withdraw_date": withdraw_date,
+            }
+
+        # 引落イベント生成（amountはマイナス）
+        event_rows.append(
+            {
+                "user_id": user_id,
+                "date": withdraw_date,
+                "amount_yen": -total,
+                "account_id": card.payment_account_id,
+                "plan_id": None,
+                "description": f"カード引落: {card.name} ({period_start}〜{period_end})",
+                "source": "card",
+                "status": "expected",
+            }
+        )
+
+    if new_stmts:
+        db.execute(insert(CardStatement), list(new_stmts.values()))
+    if event_rows:
+        db.execute(insert(CashflowEvent), event_rows)
 
     db.commit()
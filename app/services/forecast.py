@@ -17,11 +17,14 @@ def _iso(d: Any) -> str:
     return str(d)
 
 
+_ONE_DAY = timedelta(days=1)
+
+
 def _daterange(start: date, end: date):
     d = start
     while d <= end:
         yield d
-        d += timedelta(days=1)
+        d += _ONE_DAY
 
 
 def _is_account_active_on(account: Account, d: date) -> bool:
@@ -58,8 +61,9 @@ def forecast_by_account_events(
     }
     start_balances = dict(balances)
 
+    # only the columns the timeline uses; plain rows instead of ORM instances
     events = (
-        db.query(CashflowEvent)
+        db.query(CashflowEvent.id, CashflowEvent.date, CashflowEvent.amount_yen, CashflowEvent.account_id)
         .filter(
             CashflowEvent.user_id == user_id,
             CashflowEvent.date >= start,
@@ -70,9 +74,19 @@ def forecast_by_account_events(
         .all()
     )
 
+    # every point on the same date shares one formatted date string
+    start_iso = _iso(start)
     series: dict[int, list[dict]] = defaultdict(list)
+    # running (min balance, its date) per account, updated as points are appended (first minimum wins)
+    acc_min: dict[int, tuple[int, Any]] = {}
     marker_by_date: dict[date, list[dict]] = defaultdict(list)
 
+    def _append_point(aid: int, point: dict) -> None:
+        series[aid].append(point)
+        cur = acc_min.get(aid)
+        if cur is None or point["balance_yen"] < cur[0]:
+            acc_min[aid] = (point["balance_yen"], point["date"])
+
     for a in accounts:
         aid = int(a.id)
         start_d = getattr(a, "effective_start_date", None)
@@ -91,16 +105,17 @@ def forecast_by_account_events(
     if include_start_point:
         for a in accounts:
             aid = int(a.id)
-            series[aid].append(
+            _append_point(
+                aid,
                 {
-                    "date": _iso(start),
+                    "date": start_iso,
                     "balance_yen": int(balances[aid]),
                     "delta_yen": 0,
                     "event_id": None,
-                }
+                },
             )
 
-    events_by_date: dict[date, list[CashflowEvent]] = defaultdict(list)
+    events_by_date: dict[date, list] = defaultdict(list)
     for ev in events:
         events_by_date[ev.date].append(ev)
 
@@ -109,7 +124,7 @@ def forecast_by_account_events(
     if include_start_point:
         total_series.append(
             {
-                "date": _iso(start),
+                "date": start_iso,
                 "balance_yen": int(total_balance),
                 "delta_yen": 0,
                 "event_id": None,
@@ -118,6 +133,7 @@ def forecast_by_account_events(
 
     timeline_dates = sorted(set(events_by_date.keys()) | set(marker_by_date.keys()))
     for d in timeline_dates:
+        d_iso = _iso(d)
         for marker in marker_by_date.get(d, []):
             aid = int(marker["account_id"])
             if aid not in balances:
@@ -131,19 +147,20 @@ def forecast_by_account_events(
 
             delta = after - before
             balances[aid] = after
-            series[aid].append(
+            _append_point(
+                aid,
                 {
-                    "date": _iso(d),
+                    "date": d_iso,
                     "balance_yen": int(after),
                     "delta_yen": int(delta),
                     "event_id": None,
-                }
+                },
             )
 
             total_balance += delta
             total_series.append(
                 {
-                    "date": _iso(d),
+                    "date": d_iso,
                     "balance_yen": int(total_balance),
                     "delta_yen": int(delta),
                     "event_id": None,
@@ -160,19 +177,20 @@ def forecast_by_account_events(
 
             delta = int(ev.amount_yen)
             balances[aid] += delta
-            series[aid].append(
+            _append_point(
+                aid,
                 {
-                    "date": _iso(d),
+                    "date": d_iso,
                     "balance_yen": int(balances[aid]),
                     "delta_yen": int(delta),
                     "event_id": int(ev.id),
-                }
+                },
             )
 
             total_balance += delta
             total_series.append(
                 {
-                    "date": _iso(d),
+                    "date": d_iso,
                     "balance_yen": int(total_balance),
                     "delta_yen": int(delta),
                     "event_id": int(ev.id),
@@ -183,7 +201,13 @@ def forecast_by_account_events(
     for a in accounts:
         aid = int(a.id)
         s = list(series.get(aid) or [])
-        summary = _summarize_series(s, start, int(start_balances[aid]), danger_threshold_yen)
+        start_balance = int(start_balances[aid])
+        if s:
+            min_balance, min_date = acc_min[aid]
+            end_balance = int(s[-1]["balance_yen"])
+        else:
+            min_balance, min_date, end_balance = start_balance, start, start_balance
+        summary = _series_summary(min_balance, min_date, end_balance, danger_threshold_yen)
         accounts_out.append(
             {
                 "account_id": aid,
@@ -207,50 +231,43 @@ def forecast_by_account_daily(db: Session, user_id: int, start: date, end: date)
 
     out_accounts = []
 
-    for acc in base["accounts"]:
-        bal_by_date: dict[str, int] = {}
-        for p in acc["series"]:
-            bal_by_date[str(p["date"])] = int(p["balance_yen"])
+    # the day axis is the same for every account, so format it once
+    day_keys = [_iso(d) for d in _daterange(start, end)]
+    balance_rows: list[list[int]] = []
 
-        daily = []
+    for acc in base["accounts"]:
+        # balances aligned to day_keys (last known balance carried forward);
+        # the sparse series is already in date order, so walk it alongside the days
+        points = acc["series"]
+        i, n = 0, len(points)
+        balances: list[int] = []
         last_balance = int(acc["start_balance_yen"])
-
-        for d in _daterange(start, end):
-            key = _iso(d)
-            if key in bal_by_date:
-                last_balance = int(bal_by_date[key])
-            daily.append({"date": key, "balance_yen": int(last_balance)})
+        for key in day_keys:
+            while i < n and points[i]["date"] <= key:
+                last_balance = int(points[i]["balance_yen"])
+                i += 1
+            balances.append(last_balance)
+        balance_rows.append(balances)
 
         out_accounts.append(
             {
                 "account_id": acc["account_id"],
                 "name": acc["name"],
                 "start_balance_yen": acc["start_balance_yen"],
-                "series": daily,
+                "series": [{"date": k, "balance_yen": b} for k, b in zip(day_keys, balances)],
             }
         )
 
-    total_by_date: dict[str, int] = {}
-    for acc in out_accounts:
-        for p in acc["series"]:
-            total_by_date[p["date"]] = total_by_date.get(p["date"], 0) + int(p["balance_yen"])
-
-    total_daily = [{"date": d, "balance_yen": int(total_by_date[d])} for d in sorted(total_by_date.keys())]
+    # every account row is aligned to day_keys, so the total is a column sum (empty when there are no accounts)
+    total_daily = [
+        {"date": key, "balance_yen": sum(column)}
+        for key, column in zip(day_keys, zip(*balance_rows))
+    ]
 
     return {"start": start, "end": end, "accounts": out_accounts, "total_series": total_daily}
 
 
-def _summarize_series(series, start_date, start_balance, danger_threshold_yen=0):
-    if not series:
-        min_balance = start_balance
-        min_date = start_date
-        end_balance = start_balance
-    else:
-        min_point = min(series, key=lambda p: int(p.get("balance_yen", start_balance)))
-        min_balance = int(min_point.get("balance_yen", start_balance))
-        min_date = min_point.get("date", start_date)
-        end_balance = int(series[-1].get("balance_yen", start_balance))
-
+def _series_summary(min_balance, min_date, end_balance, danger_threshold_yen=0):
     return {
         "min_balance_yen": min_balance,
         "min_date": min_date,
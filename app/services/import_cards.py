@@ -17,13 +17,18 @@ class ParsedTxn:
     fingerprint: str
     raw_json: str
 
+# 行ごとに使うのでモジュール読み込み時に1回だけコンパイルする
+_WHITESPACE_RE = re.compile(r"\s+")
+_MERCHANT_SYMBOL_RE = re.compile(r"[^\wぁ-んァ-ン一-龥 ]+")
+
+
 def _norm_merchant(s: str) -> str:
     s = (s or "").strip()
     s = s.replace("　", " ")
-    s = re.sub(r"\s+", " ", s)
+    s = _WHITESPACE_RE.sub(" ", s)
     s = s.lower()
     # よくある揺れ対策（必要に応じて増やす）
-    s = re.sub(r"[^\wぁ-んァ-ン一-龥 ]+", "", s)  # 記号をざっくり落とす
+    s = _MERCHANT_SYMBOL_RE.sub("", s)  # 記号をざっくり落とす
     return s
 
 def _sha256_hex(text: str) -> str:
@@ -2,7 +2,6 @@ from __future__ import annotations
 
 from datetime import date, timedelta
 import calendar
-from sqlalchemy import func
 from sqlalchemy.orm import Session
 
 from app.models import (
@@ -12,12 +11,12 @@ from app.models import (
     VariableRecurringConfirmation,
     CashflowEvent,
     Card,
-    CardTransaction,
     CardStatement,
     CardRevolving,
     CardInstallment,
 )
 from app.utils.dates import resolve_day_in_month, apply_business_day_rule
+from app.services.card_billing import sum_card_transactions_by_period
 
 
 def _month_add(y: int, m: int, add: int) -> tuple[int, int]:
@@ -406,6 +405,8 @@ def build_card_withdraw_events(db: Session, user_id: int, withdraw_y: int, withd
     created: list[CashflowEvent] = []
     withdraw_month_first = date(withdraw_y, withdraw_m, 1)
 
+    active: list[tuple[Card, date, date, date, date | None, date | None]] = []
+    usage_periods: dict[int, tuple[int, date, date]] = {}
     for card in cards:
         period_start, period_end, withdraw_date = card_period_for_withdraw_month(card, withdraw_y, withdraw_m)
         card_start = getattr(card, "effective_start_date", None)
@@ -417,20 +418,27 @@ def build_card_withdraw_events(db: Session, user_id: int, withdraw_y: int, withd
                 CardStatement.withdraw_date == withdraw_date,
             ).delete(synchronize_session=False)
             continue
+        active.append((card, period_start, period_end, withdraw_date, card_start, card_end))
         valid_period = _clip_range_to_effective(period_start, period_end, card_start, card_end)
-        has_valid_period = valid_period is not None
-        valid_start, valid_end = valid_period if valid_period is not None else (period_start, period_end)
-
-        if has_valid_period:
-            total = db.query(func.coalesce(func.sum(CardTransaction.amount_yen), 0)).filter(
-                CardTransaction.card_id == card.id,
-                CardTransaction.date >= valid_start,
-                CardTransaction.date <= valid_end,
-            ).scalar()
-        else:
-            total = 0
+        if valid_period is not None:
+            usage_periods[card.id] = (card.id, *valid_period)
+
+    # カード利用額は全カード分を1クエリで集計する
+    usage_totals = sum_card_transactions_by_period(db, usage_periods)
+
+    # 既存 statement も (card_id, withdraw_date) で1回だけまとめて引く
+    existing_stmts: dict[tuple[int, date], CardStatement] = {}
+    if active:
+        existing_stmts = {
+            (s.card_id, s.withdraw_date): s
+            for s in db.query(CardStatement).filter(
+                CardStatement.card_id.in_(sorted({card.id for card, *_ in active})),
+                CardStatement.withdraw_date.in_(sorted({wd for _, _, _, wd, _, _ in active})),
+            )
+        }
 
-        total = int(total or 0)
+    for card, period_start, period_end, withdraw_date, card_start, card_end in active:
+        total = usage_totals.get(card.id, 0)
 
         # plan (payment_method=card) の予定支出も加算
         plans = (
@@ -558,10 +566,7 @@ def build_card_withdraw_events(db: Session, user_id: int, withdraw_y: int, withd
 
 
         # statement（保存しておくと後で整合性が取れる）
-        stmt = db.query(CardStatement).filter(
-            CardStatement.card_id == card.id,
-            CardStatement.withdraw_date == withdraw_date,
-        ).one_or_none()
+        stmt = existing_stmts.get((card.id, withdraw_date))
 
         if stmt is None:
             stmt = CardStatement(
@@ -572,6 +577,7 @@ def build_card_withdraw_events(db: Session, user_id: int, withdraw_y: int, withd
                 withdraw_date=withdraw_date,
             )
             db.add(stmt)
+            existing_stmts[(card.id, withdraw_date)] = stmt
         else:
             stmt.period_start = period_start
             stmt.period_end = period_end
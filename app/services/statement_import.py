@@ -1,15 +1,24 @@
 from __future__ import annotations
 
+import codecs
 import csv
 import io
 import re
 import unicodedata
-from datetime import date, datetime
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from datetime import date
+from functools import lru_cache
+from typing import BinaryIO
+
+from app.utils.dates import parse_ymd
 
 DATE_YMD_RE = re.compile(r"(?P<y>\d{4})[/-](?P<m>\d{1,2})[/-](?P<d>\d{1,2})")
 DATE_MD_RE = re.compile(r"(?P<m>\d{1,2})[/-](?P<d>\d{1,2})")
 DATE_JP_YMD_RE = re.compile(r"(?P<y>\d{4})\s*年\s*(?P<m>\d{1,2})\s*月\s*(?P<d>\d{1,2})\s*日")
 DATE_JP_MD_RE = re.compile(r"(?P<m>\d{1,2})\s*月\s*(?P<d>\d{1,2})\s*日")
+WHITESPACE_RE = re.compile(r"\s+")
+NON_DIGIT_RE = re.compile(r"\D")
 MONEY_RE = re.compile(r"(?:[+\-](?:[¥￥]\s*)?\(?\d[\d,]*\)?|[¥￥]?\s*\(?\d[\d,]*\)?)\s*円?")
 
 HEADER_FOOTER_RE = re.compile(
@@ -21,23 +30,24 @@ HEADER_FOOTER_RE = re.compile(
 def normalize_text_line(line: str) -> str:
     s = unicodedata.normalize("NFKC", line or "")
     s = s.replace("\t", " ")
-    s = re.sub(r"\s+", " ", s).strip()
+    s = WHITESPACE_RE.sub(" ", s).strip()
     return s
 
 
+# Statement imports repeat the same dates/titles many times per batch; both helpers are pure.
+@lru_cache(maxsize=8192)
 def normalize_title(title: str) -> str:
     s = normalize_text_line(title)
     s = s.strip("-:/| ")
     return s or "不明"
 
 
+@lru_cache(maxsize=8192)
 def parse_flexible_date(value: str, *, default_year: int | None = None) -> date:
     s = normalize_text_line(value)
-    for fmt in ("%Y/%m/%d", "%Y-%m-%d", "%Y.%m.%d"):
-        try:
-            return datetime.strptime(s, fmt).date()
-        except ValueError:
-            pass
+    d = parse_ymd(s)
+    if d is not None:
+        return d
 
     m_jp = DATE_JP_YMD_RE.fullmatch(s)
     if m_jp:
@@ -90,18 +100,53 @@ def _append_kind(title: str, kind: str | None) -> str:
     return t
 
 
-def _parse_csv_dict_rows(content: bytes) -> list[dict[str, str]]:
-    last_err = None
-    for enc in ("utf-8-sig", "cp932", "utf-8"):
+CSV_SNIFF_CHUNK_SIZE = 64 * 1024
+
+
+def detect_csv_encoding(stream: BinaryIO) -> str:
+    """
+    utf-8(BOM可) として最後まで復号できれば utf-8-sig、途中で失敗すれば cp932 とみなす。
+    チャンク単位で検証するので全体をメモリに載せない。読み取り位置は先頭に戻す。
+    """
+    stream.seek(0)
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    try:
+        while chunk := stream.read(CSV_SNIFF_CHUNK_SIZE):
+            decoder.decode(chunk)
+        decoder.decode(b"", final=True)
+        encoding = "utf-8-sig"
+    except UnicodeDecodeError:
+        encoding = "cp932"
+    stream.seek(0)
+    return encoding
+
+
+def peek_csv_header(stream: BinaryIO) -> list[str] | None:
+    """
+    先頭行だけを復号してヘッダ列を返す。全体のエンコーディング判定より前に不正なファイルを弾くためのもの。
+    先頭行を復号できない場合は None。読み取り位置は先頭に戻す。
+    """
+    stream.seek(0)
+    head = stream.readline(CSV_SNIFF_CHUNK_SIZE)
+    stream.seek(0)
+    for encoding in ("utf-8-sig", "cp932"):
         try:
-            text = content.decode(enc)
-            reader = csv.DictReader(io.StringIO(text))
-            if not reader.fieldnames:
-                raise ValueError("CSV header is required")
-            return [dict(r) for r in reader]
-        except Exception as e:
-            last_err = e
-    raise ValueError(f"csv decode failed: {last_err}")
+            line = head.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+        return next(csv.reader([line]), [])
+    return None
+
+
+@contextmanager
+def open_csv_dict_reader(stream: BinaryIO) -> Iterator[csv.DictReader]:
+    """バイナリストリームを1行ずつ復号する DictReader を返す（元のストリームは閉じない）。"""
+    encoding = detect_csv_encoding(stream)
+    text = io.TextIOWrapper(stream, encoding=encoding, newline="")
+    try:
+        yield csv.DictReader(text)
+    finally:
+        text.detach()
 
 
 def _resolve_csv_headers(fieldnames: list[str]) -> dict[str, str]:
@@ -123,22 +168,31 @@ def _resolve_csv_headers(fieldnames: list[str]) -> dict[str, str]:
     return {"date": date_key, "title": title_key, "price": price_key}
 
 
-def parse_card_csv_preview(content: bytes) -> tuple[list[dict], list[str], list[str]]:
-    rows = _parse_csv_dict_rows(content)
-    if not rows:
-        return [], [], []
-
+def parse_card_csv_preview(content: bytes | BinaryIO) -> tuple[list[dict], list[str], list[str]]:
+    stream = io.BytesIO(content) if isinstance(content, (bytes, bytearray)) else content
     try:
-        h = _resolve_csv_headers(list(rows[0].keys()))
-    except ValueError as e:
-        return [], [], [str(e)]
+        with open_csv_dict_reader(stream) as reader:
+            if not reader.fieldnames:
+                raise ValueError("csv decode failed: CSV header is required")
+            return _parse_card_csv_rows(reader)
+    except UnicodeDecodeError as e:
+        raise ValueError(f"csv decode failed: {e}")
 
+
+def _parse_card_csv_rows(reader: Iterable[dict[str, str]]) -> tuple[list[dict], list[str], list[str]]:
+    h: dict[str, str] | None = None
     out: list[dict] = []
     warnings: list[str] = []
     errors: list[str] = []
     today_str = date.today().strftime("%Y/%m/%d")
 
-    for i, r in enumerate(rows, start=2):
+    for i, r in enumerate(reader, start=2):
+        if h is None:
+            try:
+                h = _resolve_csv_headers(list(r.keys()))
+            except ValueError as e:
+                return [], [], [str(e)]
+
         row = {str(k).strip(): (v or "") for k, v in r.items()}
         if not any(v.strip() for v in row.values()):
             continue
@@ -215,7 +269,7 @@ def _extract_amount_from_line(line: str, *, skip_span: tuple[int, int] | None =
         # Date fragments noise guard.
         if ("," not in cleaned and "¥" not in cleaned and "￥" not in cleaned and "円" not in cleaned
                 and not cleaned.startswith("-") and not cleaned.startswith("+") and not cleaned.startswith("(")
-                and len(re.sub(r"\D", "", cleaned)) <= 2):
+                and len(NON_DIGIT_RE.sub("", cleaned)) <= 2):
             continue
         try:
             amount = parse_money(token)
@@ -308,8 +362,8 @@ def _parse_tabular_statement_line(
 
 
 def parse_card_text_preview(text: str, *, default_year: int | None = None) -> tuple[list[dict], list[str], list[str]]:
-    raw_lines = [(x or "").strip() for x in (text or "").replace("\r\n", "\n").split("\n")]
-    raw_lines = [x for x in raw_lines if x]
+    # lazily strip/skip blank lines instead of building intermediate lists of the whole paste
+    raw_lines = (x for x in (line.strip() for line in (text or "").splitlines()) if x)
 
     rows: list[dict] = []
     errors: list[str] = []
@@ -40,6 +40,16 @@
       rowIdAttr: 'data-card-installment-id',
       label: '分割',
     },
+    {
+      formId: 'card-charge-bulk-delete-form',
+      btnId: 'card-charge-bulk-delete-btn',
+      hiddenId: 'card-charge-bulk-delete-ids',
+      tableId: 'card-charge-table',
+      selectAllId: 'card-charge-select-all',
+      rowSelector: '.card-charge-select',
+      rowIdAttr: 'data-card-charge-id',
+      label: 'クレカチャージ',
+    },
   ];
 
   function initBulkDelete(config) {
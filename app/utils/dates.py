@@ -1,13 +1,43 @@
 from __future__ import annotations
 from datetime import date, timedelta
+from functools import lru_cache
 import calendar
 
+@lru_cache(maxsize=64)
 def month_range(d: date) -> tuple[date, date]:
     first = d.replace(day=1)
-    last_day = calendar.monthrange(first.year, first.month)[1]
-    last = first.replace(day=last_day)
+    last = first.replace(day=last_day_of_month(first.year, first.month))
     return first, last
 
+_YMD_SEPARATORS = frozenset("/-.")
+
+def parse_ymd(s: str) -> date | None:
+    """
+    YYYY/MM/DD・YYYY-MM-DD・YYYY.MM.DD（月日は1〜2桁可）を date にする。
+    strptime を使わずスライスで読む。形式外・存在しない日付は None。
+    """
+    if len(s) == 10 and s[4] == s[7] and s[4] in _YMD_SEPARATORS:
+        y, m, d = s[0:4], s[5:7], s[8:10]
+    else:
+        sep = s[4:5]
+        if sep not in _YMD_SEPARATORS:
+            return None
+        parts = s.split(sep)
+        if len(parts) != 3 or len(parts[0]) != 4 or not (1 <= len(parts[1]) <= 2) or not (1 <= len(parts[2]) <= 2):
+            return None
+        y, m, d = parts
+    if not (s.isascii() and y.isdigit() and m.isdigit() and d.isdigit()):
+        return None
+    try:
+        return date(int(y), int(m), int(d))
+    except ValueError:
+        return None
+
+def next_month_first(d: date) -> date:
+    if d.month == 12:
+        return date(d.year + 1, 1, 1)
+    return date(d.year, d.month + 1, 1)
+
 # --- 祝日対応（holidaysが入っている前提） ---
 try:
     import holidays  # pip install holidays
@@ -15,6 +45,7 @@ try:
 except Exception:
     _JP_HOLIDAYS = None  # 依存が無い環境でも最低限動くように
 
+@lru_cache(maxsize=256)
 def last_day_of_month(year: int, month: int) -> int:
     return calendar.monthrange(year, month)[1]
 
@@ -0,0 +1,30 @@
+"""add cashflow_events source indexes
+
+Revision ID: b5e1c7d2a9f4
+Revises: f3d78e4d9067
+Create Date: 2026-10-16 09:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5e1c7d2a9f4'
+down_revision: Union[str, Sequence[str], None] = 'f3d78e4d9067'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_cashflow_source_transfer', 'cashflow_events', ['source', 'transfer_id'], unique=False)
+    op.create_index('ix_cashflow_source_id', 'cashflow_events', ['source', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_cashflow_source_id', table_name='cashflow_events')
+    op.drop_index('ix_cashflow_source_transfer', table_name='cashflow_events')
@@ -0,0 +1,28 @@
+"""add card_transactions (card_id, date) index
+
+Revision ID: c8a4f0e13b62
+Revises: b5e1c7d2a9f4
+Create Date: 2026-10-16 11:02:17.904533
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c8a4f0e13b62'
+down_revision: Union[str, Sequence[str], None] = 'b5e1c7d2a9f4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_card_transactions_card_date', 'card_transactions', ['card_id', 'date'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_card_transactions_card_date', table_name='card_transactions')
@@ -0,0 +1,30 @@
+"""add indexes for recent cashflow/card transaction lists
+
+Revision ID: d2f6a81b7c35
+Revises: c8a4f0e13b62
+Create Date: 2026-10-16 13:41:05.218734
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2f6a81b7c35'
+down_revision: Union[str, Sequence[str], None] = 'c8a4f0e13b62'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_cashflow_user_source_date_id', 'cashflow_events', ['user_id', 'source', 'date', 'id'], unique=False)
+    op.create_index('ix_card_transactions_date_id', 'card_transactions', ['date', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_card_transactions_date_id', table_name='card_transactions')
+    op.drop_index('ix_cashflow_user_source_date_id', table_name='cashflow_events')
@@ -0,0 +1,28 @@
+"""add cashflow_events (user_id, date) index
+
+Revision ID: e7b3c95d0a18
+Revises: d2f6a81b7c35
+Create Date: 2026-10-16 15:12:48.603917
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7b3c95d0a18'
+down_revision: Union[str, Sequence[str], None] = 'd2f6a81b7c35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_cashflow_user_date', 'cashflow_events', ['user_id', 'date'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_cashflow_user_date', table_name='cashflow_events')
@@ -0,0 +1,42 @@
+"""add card_transactions.charge_to_account_id
+
+Revision ID: f1c94a7e2d06
+Revises: e7b3c95d0a18
+Create Date: 2026-10-16 16:40:21.318754
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1c94a7e2d06'
+down_revision: Union[str, Sequence[str], None] = 'e7b3c95d0a18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# app.main.CHARGE_NOTE_PREFIX at the time of this revision (migrations must not import app code)
+CHARGE_NOTE_PREFIX = "charge to account_id="
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("card_transactions", sa.Column("charge_to_account_id", sa.Integer(), nullable=True))
+
+    # 既存のチャージ行は note（"charge to account_id=123"）から埋める
+    op.execute(
+        sa.text(
+            "UPDATE card_transactions"
+            " SET charge_to_account_id = CAST(SUBSTR(note, :start) AS INTEGER)"
+            " WHERE note LIKE :prefix"
+        ).bindparams(start=len(CHARGE_NOTE_PREFIX) + 1, prefix=f"{CHARGE_NOTE_PREFIX}%")
+    )
+    op.create_index('ix_card_transactions_charge_to_account', 'card_transactions', ['charge_to_account_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_card_transactions_charge_to_account', table_name='card_transactions')
+    op.drop_column('card_transactions', 'charge_to_account_id')
@@ -1,9 +1,10 @@
 ﻿import os
 import unittest
+from unittest import mock
 from datetime import date, timedelta
 
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, delete
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
@@ -11,8 +12,8 @@ from sqlalchemy.pool import StaticPool
 os.environ.setdefault("DB_URL", "sqlite:///:memory:")
 
 import app.main as main
-from app.db import Base
-from app.models import Account, Card, CardTransaction, CashflowEvent
+from app.db import Base, read_data_version
+from app.models import Account, Card, CardTransaction, CashflowEvent, ImportBatch
 
 
 class ApiIntegrationTests(unittest.TestCase):
@@ -33,6 +34,9 @@ class ApiIntegrationTests(unittest.TestCase):
                 db.close()
 
         main.app.dependency_overrides[main.get_db] = override_get_db
+        # read caches are per process; never let a page rendered from another test's DB leak in
+        main._INDEX_PAGE_CACHE.clear()
+        main._FORECAST_FREE_CACHE.clear()
         self.client = TestClient(main.app)
 
     def tearDown(self) -> None:
@@ -107,6 +111,202 @@ class ApiIntegrationTests(unittest.TestCase):
         pie_json = pie_res.json()
         self.assertGreaterEqual(int(pie_json.get("total_yen", 0)), 1200)
 
+    def test_forecast_free_etag_revalidation(self) -> None:
+        self._seed_account()
+        self.client.post("/events/rebuild", follow_redirects=False)
+
+        first = self.client.get("/api/forecast/free")
+        self.assertEqual(first.status_code, 200)
+        etag = first.headers.get("etag")
+        self.assertTrue(etag)
+
+        cached = self.client.get("/api/forecast/free", headers={"If-None-Match": etag})
+        self.assertEqual(cached.status_code, 304)
+
+    def test_card_merchant_pie_clamps_to_effective_start(self) -> None:
+        account_id = self._seed_account()
+        month_first = date.today().replace(day=1)
+        db = self.Session()
+        try:
+            probe = Card(name="probe", closing_day=15, payment_day=27, payment_account_id=account_id)
+            period_start, period_end, _ = main.card_period_for_withdraw_month(probe, month_first.year, month_first.month)
+            effective_start = period_start + timedelta(days=5)
+            card = Card(
+                name="Clamp Card",
+                closing_day=15,
+                payment_day=27,
+                payment_account_id=account_id,
+                effective_start_date=effective_start,
+                effective_end_date=None,
+            )
+            db.add(card)
+            db.flush()
+            # before effective_start: must be excluded from the pie
+            db.add(CardTransaction(card_id=card.id, date=period_start, amount_yen=900, merchant="Too Early"))
+            db.add(CardTransaction(card_id=card.id, date=period_end, amount_yen=1500, merchant="In Range"))
+            db.add(
+                CardTransaction(
+                    card_id=card.id,
+                    date=period_end,
+                    amount_yen=700,
+                    merchant="charge",
+                    note=f"charge to account_id={account_id}",
+                    charge_to_account_id=account_id,
+                )
+            )
+            db.commit()
+            card_id = int(card.id)
+        finally:
+            db.close()
+
+        res = self.client.get(
+            "/api/cards/merchant-pie",
+            params={"card_id": card_id, "withdraw_month": month_first.strftime("%Y-%m")},
+        )
+        self.assertEqual(res.status_code, 200)
+        body = res.json()
+        self.assertEqual(body["card_name"], "Clamp Card")
+        self.assertEqual(body["analyzed_start"], effective_start.isoformat())
+        self.assertEqual(int(body["total_yen"]), 2200)
+        labels = {item["label"] for item in body["items"]}
+        self.assertIn("In Range", labels)
+        self.assertNotIn("Too Early", labels)
+        self.assertIn("チャージ: IT Bank", labels)
+
+    def test_transfer_bank_with_blank_card_id(self) -> None:
+        from_id = self._seed_account()
+        to_id = self._seed_account()
+
+        # posted exactly as partials/_transfer.html renders it: the card select defaults to value=""
+        res = self.client.post(
+            "/transfer",
+            data={
+                "date": date.today().isoformat(),
+                "method": "bank",
+                "amount_yen": "3000",
+                "from_account_id": str(from_id),
+                "to_account_id": str(to_id),
+                "card_id": "",
+                "description": "",
+            },
+            follow_redirects=False,
+        )
+        self.assertEqual(res.status_code, 303)
+
+        db = self.Session()
+        try:
+            events = (
+                db.query(CashflowEvent)
+                .filter(CashflowEvent.source == "transfer")
+                .order_by(CashflowEvent.amount_yen)
+                .all()
+            )
+            self.assertEqual([(int(e.account_id), int(e.amount_yen)) for e in events], [(from_id, -3000), (to_id, 3000)])
+            self.assertEqual(events[0].transfer_id, events[1].transfer_id)
+        finally:
+            db.close()
+
+    def test_forecast_free_if_none_match_lists_weak_and_star(self) -> None:
+        self._seed_account()
+        etag = self.client.get("/api/forecast/free").headers["etag"]
+
+        for header in (f'"other", {etag}', f"W/{etag}", f'W/"other" ,W/{etag}', "*"):
+            res = self.client.get("/api/forecast/free", headers={"If-None-Match": header})
+            self.assertEqual(res.status_code, 304, header)
+        res = self.client.get("/api/forecast/free", headers={"If-None-Match": '"other", W/"another"'})
+        self.assertEqual(res.status_code, 200)
+
+    def test_forecast_free_recomputed_after_write_outside_http(self) -> None:
+        account_id = self._seed_account()
+        first = self.client.get("/api/forecast/free")
+        self.assertEqual(first.status_code, 200)
+
+        # committed by another worker/script: this process never sees a request for it
+        db = self.Session()
+        try:
+            db.add(
+                CashflowEvent(
+                    user_id=1,
+                    date=date.today(),
+                    account_id=account_id,
+                    amount_yen=-4321,
+                    plan_id=None,
+                    description="other worker",
+                    source="oneoff",
+                    status="expected",
+                )
+            )
+            db.commit()
+        finally:
+            db.close()
+
+        second = self.client.get("/api/forecast/free", headers={"If-None-Match": first.headers["etag"]})
+        self.assertEqual(second.status_code, 200)
+        self.assertNotEqual(second.headers["etag"], first.headers["etag"])
+
+    def test_index_cache_dropped_after_post(self) -> None:
+        account_id = self._seed_account()
+
+        first = self.client.get("/")
+        self.assertEqual(first.status_code, 200)
+        self.assertNotIn("Cache Probe Oneoff", first.text)
+        self.assertEqual(len(main._INDEX_PAGE_CACHE), 1)
+
+        res = self.client.post(
+            "/oneoff",
+            data={
+                "date": date.today().isoformat(),
+                "account_id": str(account_id),
+                "amount_yen": "500",
+                "direction": "expense",
+                "description": "Cache Probe Oneoff",
+            },
+            follow_redirects=False,
+        )
+        self.assertEqual(res.status_code, 303)
+
+        second = self.client.get("/")
+        self.assertEqual(second.status_code, 200)
+        self.assertIn("Cache Probe Oneoff", second.text)
+
+    def test_index_cache_misses_after_write_outside_http(self) -> None:
+        self._seed_account()
+
+        first = self.client.get("/")
+        self.assertEqual(first.status_code, 200)
+        self.assertNotIn("Other Worker Bank", first.text)
+
+        # committed by another worker/script: this process never sees a request for it
+        db = self.Session()
+        try:
+            db.add(Account(name="Other Worker Bank", kind="bank", balance_yen=1000, user_id=1))
+            db.commit()
+        finally:
+            db.close()
+
+        second = self.client.get("/")
+        self.assertEqual(second.status_code, 200)
+        self.assertIn("Other Worker Bank", second.text)
+
+    def test_data_version_bumped_only_by_committed_writes(self) -> None:
+        db = self.Session()
+        try:
+            self.assertEqual(read_data_version(db), 0)
+            db.add(Account(name="Rolled Back", kind="bank", balance_yen=0, user_id=1))
+            db.flush()
+            db.rollback()
+            self.assertEqual(read_data_version(db), 0)
+
+            db.execute(delete(Account).where(Account.id == -1))
+            db.commit()
+            self.assertEqual(read_data_version(db), 1)
+
+            db.query(Account).all()
+            db.commit()
+            self.assertEqual(read_data_version(db), 1)
+        finally:
+            db.close()
+
     def test_oneoff_import_text_creates_event(self) -> None:
         account_id = self._seed_account()
 
@@ -135,6 +335,132 @@ class ApiIntegrationTests(unittest.TestCase):
         finally:
             db.close()
 
+    def test_card_csv_import_rejects_missing_header(self) -> None:
+        account_id = self._seed_account()
+        self._seed_card_with_transaction(account_id)
+        body = "yyyy/mm/dd,title,price\n2026/02/04,Header Probe,100\n".encode("utf-8")
+
+        res = self.client.post(
+            "/card-transactions/import-csv",
+            files={"file": ("tx.csv", body, "text/csv")},
+            follow_redirects=False,
+        )
+        self.assertEqual(res.status_code, 400)
+        self.assertEqual(res.json()["detail"], "CSV headers must include: yyyy/mm/dd, title, price, card")
+
+        db = self.Session()
+        try:
+            self.assertEqual(db.query(CardTransaction).filter(CardTransaction.merchant == "Header Probe").count(), 0)
+        finally:
+            db.close()
+
+    def test_card_csv_import_streams_cp932_in_batches(self) -> None:
+        account_id = self._seed_account()
+        card_id, _ = self._seed_card_with_transaction(account_id)
+        lines = ["yyyy/mm/dd,title,price,card"]
+        lines += [f"2026/02/{d:02d},店舗{d},\"1,{d:03d}円\",IT Card" for d in range(1, 6)]
+        lines.append(",,,")
+        body = ("\r\n".join(lines) + "\r\n").encode("cp932")
+
+        # a batch size smaller than the file forces several executemany flushes
+        with mock.patch.object(main, "CSV_INSERT_BATCH_SIZE", 2):
+            res = self.client.post(
+                "/card-transactions/import-csv",
+                files={"file": ("tx.csv", body, "text/csv")},
+                follow_redirects=False,
+            )
+        self.assertEqual(res.status_code, 303)
+
+        db = self.Session()
+        try:
+            rows = (
+                db.query(CardTransaction)
+                .filter(CardTransaction.merchant.like("店舗%"))
+                .order_by(CardTransaction.date)
+                .all()
+            )
+            self.assertEqual(
+                [(r.merchant, int(r.amount_yen), int(r.card_id)) for r in rows],
+                [(f"店舗{d}", 1000 + d, card_id) for d in range(1, 6)],
+            )
+        finally:
+            db.close()
+
+    def test_card_charge_bulk_delete_only_removes_charge_rows(self) -> None:
+        account_id = self._seed_account()
+        card_id, month_first = self._seed_card_with_transaction(account_id)
+        db = self.Session()
+        try:
+            charge = CardTransaction(
+                card_id=card_id,
+                date=month_first,
+                amount_yen=5000,
+                merchant="charge",
+                note=f"charge to account_id={account_id}",
+                charge_to_account_id=account_id,
+            )
+            purchase = CardTransaction(card_id=card_id, date=month_first, amount_yen=800, merchant="Not A Charge")
+            db.add_all([charge, purchase])
+            db.commit()
+            charge_id, purchase_id = int(charge.id), int(purchase.id)
+        finally:
+            db.close()
+
+        res = self.client.post(
+            "/card_charges/bulk-delete",
+            data={"ids": f"{charge_id},{purchase_id}"},
+            follow_redirects=False,
+        )
+        self.assertEqual(res.status_code, 303)
+
+        db = self.Session()
+        try:
+            self.assertIsNone(db.get(CardTransaction, charge_id))
+            self.assertIsNotNone(db.get(CardTransaction, purchase_id))
+        finally:
+            db.close()
+
+    def test_delete_card_detaches_import_batches(self) -> None:
+        account_id = self._seed_account()
+        card_id, _ = self._seed_card_with_transaction(account_id)
+        db = self.Session()
+        try:
+            batch = ImportBatch(source="csv_card", file_name="card.csv", card_id=card_id)
+            db.add(batch)
+            db.commit()
+            batch_id = int(batch.id)
+        finally:
+            db.close()
+
+        res = self.client.post(f"/cards/{card_id}/delete", follow_redirects=False)
+        self.assertEqual(res.status_code, 303)
+
+        db = self.Session()
+        try:
+            self.assertIsNone(db.get(Card, card_id))
+            self.assertEqual(db.query(CardTransaction).filter(CardTransaction.card_id == card_id).count(), 0)
+            batch = db.get(ImportBatch, batch_id)
+            self.assertIsNotNone(batch)
+            self.assertIsNone(batch.card_id)
+        finally:
+            db.close()
+
+    def test_oneoff_import_text_counts_errors_beyond_first_five(self) -> None:
+        account_id = self._seed_account()
+        text = "\n".join(f"2026/02/{d:02d} テスト店{d} {d}00円" for d in range(1, 8))
+
+        with mock.patch.object(main, "_parse_text_import_row", side_effect=ValueError("bad row")):
+            res = self.client.post(
+                "/oneoff/import-text",
+                data={"text": text, "account_id": str(account_id), "default_direction": "auto"},
+                follow_redirects=False,
+            )
+        self.assertEqual(res.status_code, 400)
+        detail = res.json()["detail"]
+        self.assertIn("row 5 parse error: bad row", detail)
+        self.assertNotIn("row 6", detail)
+        self.assertTrue(detail.endswith("... and 2 more"))
+
     def test_monthly_report_api_and_pdf(self) -> None:
         account_id = self._seed_account()
         card_id, month_first = self._seed_card_with_transaction(account_id)
@@ -0,0 +1,66 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from sqlalchemy import create_engine, inspect, text
+
+os.environ.setdefault("DB_URL", "sqlite:///:memory:")
+
+import app.main as main
+
+
+class InitSchemaTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.engine = create_engine(
+            f"sqlite:///{os.path.join(self.tmp.name, 'app.db')}",
+            connect_args={"check_same_thread": False},
+        )
+        patcher = mock.patch.object(main, "engine", self.engine)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self) -> None:
+        self.engine.dispose()
+        self.tmp.cleanup()
+
+    def _user_version(self) -> int:
+        with self.engine.connect() as conn:
+            return int(conn.execute(text("PRAGMA user_version")).scalar())
+
+    def test_concurrent_cold_starts_do_not_race(self) -> None:
+        workers = 4
+        barrier = threading.Barrier(workers)
+        errors: list[BaseException] = []
+
+        def start_worker() -> None:
+            barrier.wait()
+            try:
+                main.init_schema()
+            except BaseException as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=start_worker) for _ in range(workers)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(self._user_version(), main.SCHEMA_USER_VERSION)
+        self.assertIn("charge_to_account_id", {c["name"] for c in inspect(self.engine).get_columns("card_transactions")})
+
+    def test_new_table_created_without_version_bump(self) -> None:
+        main.init_schema()
+        with self.engine.begin() as conn:
+            conn.execute(text("DROP TABLE data_version"))
+
+        main.init_schema()
+        self.assertIn("data_version", inspect(self.engine).get_table_names())
+        self.assertEqual(self._user_version(), main.SCHEMA_USER_VERSION)
+
+
+if __name__ == "__main__":
+    unittest.main()
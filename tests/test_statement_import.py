@@ -120,6 +120,16 @@ class StatementImportTests(unittest.TestCase):
         details = detect_duplicates(rows, 1, set())
         self.assertEqual(details, [])
 
+    def test_parse_flexible_date_ymd_separators(self) -> None:
+        self.assertEqual(parse_flexible_date("2026/02/01"), date(2026, 2, 1))
+        self.assertEqual(parse_flexible_date("2026-2-1"), date(2026, 2, 1))
+        self.assertEqual(parse_flexible_date("2026.12.31"), date(2026, 12, 31))
+        self.assertEqual(parse_flexible_date("２０２６／０２／０１"), date(2026, 2, 1))
+        with self.assertRaises(ValueError):
+            parse_flexible_date("2026/02/30")
+        with self.assertRaises(ValueError):
+            parse_flexible_date("2026/02-01")
+
     def test_parse_flexible_date_rejects_mmdd_without_default_year(self) -> None:
         with self.assertRaises(ValueError):
             parse_flexible_date("02/10")